@@ -164,3 +164,56 @@ LOGGING = {
 
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER", "redis://localhost:6379")
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_BACKEND", "redis://localhost:6379")
+
+# Number of worker processes used to extract heartbeats from MIT-BIH records
+MITDB_EXTRACTION_WORKERS = int(os.getenv("MITDB_EXTRACTION_WORKERS", 1))
+
+# Number of samples read from every MIT-BIH record, 0 reads the records in full
+MITDB_SAMPTO = int(os.getenv("MITDB_SAMPTO", 500000)) or None
+
+# "light" runs only filtering, R-peak detection and correction,
+# "full" runs the complete biosppy ecg.ecg pipeline
+RPEAK_DETECTION_MODE = os.getenv("RPEAK_DETECTION_MODE", "light")
+
+# Per-process LRU cache of loaded models, 0 disables the corresponding bound
+MODEL_CACHE_MAX_ITEMS = int(os.getenv("MODEL_CACHE_MAX_ITEMS", 32))
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+# Import heavy modules and load models before serving requests, see gunicorn.conf.py
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "true").lower() in ("1", "true", "yes")
+PRELOAD_TRAINING_SESSIONS = [
+    training_session_id
+    for training_session_id in os.getenv("PRELOAD_TRAINING_SESSIONS", "").split(",")
+    if training_session_id
+]
+
+# Micro-batching of concurrent analysis requests for the same training session.
+# The window is disabled with 0, which suits single-threaded workers
+INFERENCE_BATCH_MAX_SIZE = int(os.getenv("INFERENCE_BATCH_MAX_SIZE", 200000))
+INFERENCE_BATCH_MAX_WAIT_MS = float(os.getenv("INFERENCE_BATCH_MAX_WAIT_MS", 0))
+
+# Words of sessions with at most this many possible words (alphabet_size ** 3) are
+# classified at training time and looked up during analysis
+LABEL_TABLE_MAX_WORDS = int(os.getenv("LABEL_TABLE_MAX_WORDS", 125000))
+ANALYSIS_USE_LABEL_TABLE = os.getenv("ANALYSIS_USE_LABEL_TABLE", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Threads shared by the three concurrent clustering fits of a training session
+TRAINING_CLUSTERING_THREADS = int(
+    os.getenv("TRAINING_CLUSTERING_THREADS", os.cpu_count() or 1)
+)
+
+# Size (MiB) of the distance blocks the training silhouette is computed in
+SILHOUETTE_WORKING_MEMORY = int(os.getenv("SILHOUETTE_WORKING_MEMORY", 256))
+
+# Hyperparameter sweeps: candidates per session and classifiers fitted at once
+TRAINING_SWEEP_MAX_CANDIDATES = int(os.getenv("TRAINING_SWEEP_MAX_CANDIDATES", 50))
+TRAINING_SWEEP_WORKERS = int(
+    os.getenv("TRAINING_SWEEP_WORKERS", min(4, os.cpu_count() or 1))
+)
+
+# Folds of the optional k-fold evaluation that are fitted at once
+TRAINING_CV_JOBS = int(os.getenv("TRAINING_CV_JOBS", os.cpu_count() or 1))
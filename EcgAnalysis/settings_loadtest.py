@@ -0,0 +1,21 @@
+# Stand-in deployment for load testing: SQLite instead of PostgreSQL and
+# Celery tasks executed in-process instead of through Redis
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, SECRET_KEY
+
+SECRET_KEY = SECRET_KEY or "loadtest"
+
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, "loadtest.sqlite3"),
+    }
+}
+
+CELERY_BROKER_URL = "memory://"
+CELERY_RESULT_BACKEND = "cache+memory://"
+CELERY_TASK_ALWAYS_EAGER = True
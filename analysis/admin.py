@@ -7,6 +7,7 @@ from analysis.models import AnalysisSession
 class AnalysisSessionAdmin(admin.ModelAdmin):
     list_display = (
         "id",
+        "status",
         "created_at",
     )
     ordering = ("-created_at",)
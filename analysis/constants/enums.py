@@ -5,3 +5,4 @@ class AnalysisSessionStatus(str, ChoicesEnum):
     INITIALIZED = "initialized"
     ANALYZING = "analyzing"
     DONE = "done"
+    FAILED = "failed"
@@ -0,0 +1,159 @@
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+from django.core.management import BaseCommand
+
+from common.utils.synthetic import generate_ecg_signal
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent synthetic ECG uploads at the analysis API and report "
+        "latency percentiles, throughput and response sizes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--training-session-id", required=True)
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--duration",
+            type=int,
+            default=60,
+            help="Duration of the uploaded ECG recordings in seconds.",
+        )
+        parser.add_argument("--fs", type=int, default=360)
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=1,
+            help="Number of requests sent before the measurements start.",
+        )
+        parser.add_argument("--timeout", type=float, default=300)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output", default=None, help="Path of the JSON file with the results."
+        )
+
+    def handle(self, *args, **kwargs):
+        ecg_signal, _ = generate_ecg_signal(
+            kwargs["duration"], fs=kwargs["fs"], seed=kwargs["seed"]
+        )
+        buffer = io.StringIO()
+        pd.DataFrame({"signal": ecg_signal}).to_csv(buffer, index=False)
+        ecg_file = buffer.getvalue().encode()
+
+        url = f"{kwargs['url'].rstrip('/')}/api/analysis/session/"
+        data = {
+            "fs": kwargs["fs"],
+            "training_session_id": kwargs["training_session_id"],
+        }
+
+        def upload(_):
+            start = time.perf_counter()
+            try:
+                response = requests.post(
+                    url,
+                    data=data,
+                    files={"ecg_file": ("ecg.csv", ecg_file, "text/csv")},
+                    timeout=kwargs["timeout"],
+                )
+            except requests.RequestException as e:
+                return time.perf_counter() - start, None, 0, type(e).__name__
+
+            return (
+                time.perf_counter() - start,
+                response.status_code,
+                len(response.content),
+                None,
+            )
+
+        self.stdout.write(
+            f"Uploading {len(ecg_file) / 2**10:.0f} KiB CSVs ({kwargs['duration']} s "
+            f"at {kwargs['fs']} Hz) to {url}"
+        )
+
+        for i in range(kwargs["warmup"]):
+            upload(i)
+
+        with ThreadPoolExecutor(max_workers=kwargs["concurrency"]) as executor:
+            start = time.perf_counter()
+            results = list(executor.map(upload, range(kwargs["requests"])))
+            elapsed = time.perf_counter() - start
+
+        report = self._get_report(results, elapsed, kwargs)
+        self._write_report(report)
+
+        if kwargs["output"]:
+            with open(kwargs["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results saved to {kwargs['output']}")
+
+    @staticmethod
+    def _get_report(results, elapsed, kwargs):
+        latencies = np.array(
+            [latency for latency, status, _, _ in results if status == 200]
+        )
+        sizes = np.array([size for _, status, size, _ in results if status == 200])
+
+        statuses = {}
+        for _, status, _, error in results:
+            key = str(status) if status is not None else error
+            statuses[key] = statuses.get(key, 0) + 1
+
+        report = {
+            "params": {
+                "requests": kwargs["requests"],
+                "concurrency": kwargs["concurrency"],
+                "duration": kwargs["duration"],
+                "fs": kwargs["fs"],
+            },
+            "elapsed": elapsed,
+            "throughput": len(latencies) / elapsed,
+            "statuses": statuses,
+        }
+
+        if len(latencies):
+            report["latency"] = {
+                "p50": np.percentile(latencies, 50),
+                "p95": np.percentile(latencies, 95),
+                "p99": np.percentile(latencies, 99),
+                "max": latencies.max(),
+            }
+            report["response_size"] = {
+                "mean": sizes.mean(),
+                "min": int(sizes.min()),
+                "max": int(sizes.max()),
+            }
+
+        return report
+
+    def _write_report(self, report):
+        self.stdout.write(f"Statuses: {report['statuses']}")
+        self.stdout.write(
+            f"Throughput: {report['throughput']:.2f} req/s "
+            f"over {report['elapsed']:.1f} s"
+        )
+
+        if "latency" not in report:
+            self.stdout.write(self.style.ERROR("No successful responses."))
+            return
+
+        latency = report["latency"]
+        self.stdout.write(
+            f"Latency: p50 {latency['p50'] * 1000:.0f} ms, "
+            f"p95 {latency['p95'] * 1000:.0f} ms, "
+            f"p99 {latency['p99'] * 1000:.0f} ms, "
+            f"max {latency['max'] * 1000:.0f} ms"
+        )
+        self.stdout.write(
+            f"Response size: mean {report['response_size']['mean'] / 2**10:.1f} KiB, "
+            f"min {report['response_size']['min'] / 2**10:.1f} KiB, "
+            f"max {report['response_size']['max'] / 2**10:.1f} KiB"
+        )
@@ -0,0 +1,72 @@
+from collections import Counter
+
+import numpy as np
+from django.core.management import BaseCommand, CommandError
+
+from analysis.utils.analyzer import ECGAnalyzer
+from common.utils.synthetic import generate_ecg_signal
+from modelling.data_preparation.utils import word_ids_to_words
+from modelling.models import TrainingSession
+
+
+class InMemoryAnalysisSession:
+    def __init__(self, fs):
+        self.fs = fs
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the labels looked up in the label table of a training session "
+        "with the full word2vec and classifier path on a synthetic ECG signal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--training-session-id", required=True)
+        parser.add_argument(
+            "--duration",
+            type=int,
+            default=600,
+            help="Duration of the synthetic signal in seconds.",
+        )
+        parser.add_argument("--fs", type=int, default=360)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        training_session = TrainingSession.objects.filter(
+            pk=kwargs["training_session_id"]
+        ).first()
+        if not training_session:
+            raise CommandError("Training session with this ID could not be found.")
+        if training_session.get_label_table() is None:
+            raise CommandError("Training session has no label table.")
+
+        ecg_signal, _ = generate_ecg_signal(
+            kwargs["duration"], fs=kwargs["fs"], seed=kwargs["seed"]
+        )
+        analysis_session = InMemoryAnalysisSession(kwargs["fs"])
+
+        analyzers = [
+            ECGAnalyzer(analysis_session, training_session, use_label_table=flag)
+            for flag in (True, False)
+        ]
+        _, *features = analyzers[0]._prepare_features(ecg_signal)
+
+        (word_ids, table_labels), (_, full_labels) = (
+            analyzer._infer(*features) for analyzer in analyzers
+        )
+
+        mismatches = np.flatnonzero(np.array(table_labels) != np.array(full_labels))
+        self.stdout.write(
+            f"{len(word_ids) - len(mismatches)} of {len(word_ids)} heartbeats "
+            f"have the same label on both paths"
+        )
+
+        words = word_ids_to_words(word_ids[mismatches])
+        for (word, table_label, full_label), count in Counter(
+            zip(
+                words,
+                np.array(table_labels)[mismatches],
+                np.array(full_labels)[mismatches],
+            )
+        ).most_common():
+            self.stdout.write(f"{word}: {table_label} / {full_label} ({count})")
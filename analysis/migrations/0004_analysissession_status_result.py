@@ -0,0 +1,43 @@
+# Generated by Django 4.2.1 on 2026-10-18 08:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import analysis.constants.enums
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("modelling", "0002_alter_trainingsession_classifier_model_and_more"),
+        ("analysis", "0003_analysissession_fs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analysissession",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("initialized", "Initialized"),
+                    ("analyzing", "Analyzing"),
+                    ("done", "Done"),
+                ],
+                default=analysis.constants.enums.AnalysisSessionStatus["INITIALIZED"],
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="analysissession",
+            name="training_session",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="modelling.trainingsession",
+            ),
+        ),
+        migrations.AddField(
+            model_name="analysissession",
+            name="result",
+            field=models.JSONField(default=dict),
+        ),
+    ]
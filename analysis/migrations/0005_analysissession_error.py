@@ -0,0 +1,33 @@
+# Generated by Django 4.2.1 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+import analysis.constants.enums
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analysis", "0004_analysissession_status_result"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="analysissession",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("initialized", "Initialized"),
+                    ("analyzing", "Analyzing"),
+                    ("done", "Done"),
+                    ("failed", "Failed"),
+                ],
+                default=analysis.constants.enums.AnalysisSessionStatus["INITIALIZED"],
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="analysissession",
+            name="error",
+            field=models.TextField(blank=True),
+        ),
+    ]
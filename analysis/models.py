@@ -4,6 +4,8 @@ from django.core.validators import FileExtensionValidator
 from django.db import models
 from django.utils import timezone
 
+from analysis.constants.enums import AnalysisSessionStatus
+
 
 def get_ecg_file_upload_to(_, filename):
     date = timezone.now().date()
@@ -13,11 +15,25 @@ def get_ecg_file_upload_to(_, filename):
 class AnalysisSession(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
+    status = models.CharField(
+        max_length=20,
+        choices=AnalysisSessionStatus.choices(),
+        default=AnalysisSessionStatus.INITIALIZED,
+    )
+    training_session = models.ForeignKey(
+        "modelling.TrainingSession", on_delete=models.SET_NULL, null=True
+    )
+
     ecg_file = models.FileField(
         upload_to=get_ecg_file_upload_to,
         validators=[FileExtensionValidator(allowed_extensions=["csv", "xlsx"])],
     )
     fs = models.IntegerField(default=360)
 
+    # Charts and table of the analysis
+    result = models.JSONField(default=dict)
+    # Why the analysis failed, if it did
+    error = models.TextField(blank=True)
+
     modified_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
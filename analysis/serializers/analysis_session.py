@@ -8,3 +8,8 @@ class AnalysisSessionSerializer(serializers.ModelSerializer):
         model = AnalysisSession
         fields = ('ecg_file', 'fs')
 
+
+class AnalysisSessionResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalysisSession
+        fields = ('status', 'result', 'error')
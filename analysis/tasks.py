@@ -0,0 +1,39 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from analysis.constants.enums import AnalysisSessionStatus
+from analysis.models import AnalysisSession
+from analysis.utils.analyzer import ECGAnalyzer
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def q_analyze_ecg(analysis_session_id):
+    session = (
+        AnalysisSession.objects.select_related("training_session")
+        .filter(id=analysis_session_id)
+        .first()
+    )
+    if not session or not session.training_session:
+        logger.warning(
+            f"Analysis session with id {analysis_session_id} does not exist. Exiting task..."
+        )
+        return
+
+    session.status = AnalysisSessionStatus.ANALYZING
+    session.save(update_fields=["status", "modified_at"])
+
+    try:
+        analyzer = ECGAnalyzer(session, session.training_session)
+        session.result = analyzer.get_analysis_result()
+    except Exception as e:
+        # the session is marked as failed, so that the clients polling it stop
+        logger.exception(f"Analysis session {analysis_session_id} failed")
+        session.status = AnalysisSessionStatus.FAILED
+        session.error = f"{e.__class__.__name__}: {e}"
+        session.save(update_fields=["status", "error", "modified_at"])
+        return
+
+    session.status = AnalysisSessionStatus.DONE
+    session.save(update_fields=["result", "status", "modified_at"])
@@ -0,0 +1,269 @@
+import threading
+import time
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+from sklearn.neighbors import KNeighborsClassifier
+
+from analysis.constants import HEARTBEAT_LABEL_VERBOSE
+from analysis.utils.analyzer import ECGAnalyzer
+from analysis.utils.dispatcher import InferenceBatchError, InferenceDispatcher
+from analysis.utils.metrics import AnalysisMetrics
+
+
+class InferenceDispatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _infer(self, *features):
+        with self.lock:
+            self.calls.append([len(arrays) for arrays in features])
+        return tuple(arrays * 10 for arrays in features)
+
+    def _submit_concurrently(self, dispatcher, submissions, infer=None):
+        # submissions are (key, features), the first one of every key is submitted
+        # first so that it leads the batch
+        results, errors = [None] * len(submissions), [None] * len(submissions)
+
+        def submit(i, key, features):
+            try:
+                results[i] = dispatcher.submit(key, infer or self._infer, *features)
+            except Exception as e:
+                errors[i] = e
+
+        threads, keys = [], set()
+        for i, (key, features) in enumerate(submissions):
+            thread = threading.Thread(target=submit, args=(i, key, features))
+            thread.start()
+            threads.append(thread)
+            if key not in keys:
+                keys.add(key)
+                self._wait_for_batch(dispatcher, key)
+
+        for thread in threads:
+            thread.join()
+
+        return results, errors
+
+    @staticmethod
+    def _wait_for_batch(dispatcher, key):
+        deadline = time.monotonic() + 5
+        while key not in dispatcher._batches and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    @staticmethod
+    def _features(start, size):
+        return np.arange(start, start + size), np.arange(start, start + size) + 0.5
+
+    def test_without_wait_infers_directly(self):
+        dispatcher = InferenceDispatcher(max_batch_size=100, max_wait=0)
+
+        result = dispatcher.submit("session", self._infer, *self._features(0, 3))
+
+        self.assertEqual(self.calls, [[3, 3]])
+        np.testing.assert_array_equal(result[0], [0, 10, 20])
+
+    def test_concurrent_requests_are_batched(self):
+        dispatcher = InferenceDispatcher(max_batch_size=6, max_wait=5)
+        submissions = [
+            ("session", self._features(0, 3)),
+            ("session", self._features(3, 1)),
+            ("session", self._features(4, 2)),
+        ]
+
+        results, errors = self._submit_concurrently(dispatcher, submissions)
+
+        # the batch is full, so it runs without waiting for the window
+        self.assertEqual(errors, [None] * 3)
+        self.assertEqual(self.calls, [[6, 6]])
+        for (_, features), result in zip(submissions, results):
+            np.testing.assert_array_equal(result[0], features[0] * 10)
+            np.testing.assert_array_equal(result[1], features[1] * 10)
+
+    def test_batch_runs_after_the_window(self):
+        dispatcher = InferenceDispatcher(max_batch_size=100, max_wait=0.05)
+
+        results, _ = self._submit_concurrently(
+            dispatcher, [("session", self._features(0, 2))]
+        )
+
+        self.assertEqual(self.calls, [[2, 2]])
+        np.testing.assert_array_equal(results[0][0], [0, 10])
+
+    def test_sessions_are_batched_apart(self):
+        dispatcher = InferenceDispatcher(max_batch_size=2, max_wait=5)
+        submissions = [
+            ("session-1", self._features(0, 1)),
+            ("session-2", self._features(10, 1)),
+            ("session-1", self._features(1, 1)),
+            ("session-2", self._features(11, 1)),
+        ]
+
+        results, _ = self._submit_concurrently(dispatcher, submissions)
+
+        self.assertEqual(self.calls, [[2, 2], [2, 2]])
+        for (_, features), result in zip(submissions, results):
+            np.testing.assert_array_equal(result[0], features[0] * 10)
+
+    def test_request_over_the_batch_size_starts_a_new_batch(self):
+        dispatcher = InferenceDispatcher(max_batch_size=4, max_wait=0.05)
+        submissions = [
+            ("session", self._features(0, 3)),
+            ("session", self._features(3, 2)),
+        ]
+
+        results, _ = self._submit_concurrently(dispatcher, submissions)
+
+        self.assertEqual(sorted(self.calls), [[2, 2], [3, 3]])
+        for (_, features), result in zip(submissions, results):
+            np.testing.assert_array_equal(result[0], features[0] * 10)
+
+    def test_failed_batch(self):
+        dispatcher = InferenceDispatcher(max_batch_size=3, max_wait=5)
+        error = ValueError("Corrupted model")
+
+        def infer(*features):
+            raise error
+
+        results, errors = self._submit_concurrently(
+            dispatcher,
+            [("session", self._features(i, 1)) for i in range(3)],
+            infer=infer,
+        )
+
+        self.assertEqual(results, [None] * 3)
+        # the leader raises the error itself, every follower an exception of its own
+        self.assertIs(errors[0], error)
+        self.assertIsInstance(errors[1], InferenceBatchError)
+        self.assertIsInstance(errors[2], InferenceBatchError)
+        self.assertIsNot(errors[1], errors[2])
+        self.assertIs(errors[1].__cause__, error)
+        self.assertIs(errors[2].__cause__, error)
+
+
+class LabelTableLookupTests(SimpleTestCase):
+    def test_lookup(self):
+        label_ids = np.zeros((2, 2, 2), dtype=np.uint8)
+        label_ids[1, 0, 1] = 1
+        label_ids[1, 1, 1] = 2
+        label_table = {"labels": np.array(["N", "V", "L"]), "label_ids": label_ids}
+        word_ids = np.array([[1, 0, 1], [0, 0, 0], [1, 1, 1], [1, 0, 1]])
+
+        labels = ECGAnalyzer._lookup_labels(label_table, word_ids)
+
+        self.assertEqual(
+            labels,
+            [
+                HEARTBEAT_LABEL_VERBOSE["V"],
+                HEARTBEAT_LABEL_VERBOSE["N"],
+                HEARTBEAT_LABEL_VERBOSE["L"],
+                HEARTBEAT_LABEL_VERBOSE["V"],
+            ],
+        )
+
+
+class InMemoryTrainingSession:
+    def __init__(self, classifier):
+        self._classifier = classifier
+
+    def get_classifier_model(self):
+        return self._classifier
+
+
+class PredictLabelsTests(SimpleTestCase):
+    def _assert_matches_row_by_row(self, **params):
+        # Heartbeats repeat a few words, whose vectors are means of letter vectors,
+        # so equal distances between training vectors are common
+        rng = np.random.default_rng(0)
+        letter_vectors = rng.normal(size=(6, 16)).astype(np.float32)
+        x_train = letter_vectors[rng.integers(0, 6, size=(500, 3))].mean(axis=1)
+        y_train = rng.choice(["N", "V", "L"], size=500)
+        classifier = KNeighborsClassifier(**params).fit(x_train, y_train)
+
+        word_ids = rng.integers(0, 6, size=(2000, 3))
+        vectors = letter_vectors[word_ids].mean(axis=1)
+        analyzer = ECGAnalyzer(None, InMemoryTrainingSession(classifier))
+
+        predicted_labels = analyzer._predict_labels(word_ids, vectors)
+
+        # the labels of the analysis before words were classified once
+        expected_labels = [
+            HEARTBEAT_LABEL_VERBOSE[classifier.predict(vector.reshape(1, -1))[0]]
+            for vector in vectors
+        ]
+        self.assertEqual(predicted_labels, expected_labels)
+
+    def test_uniform_weights(self):
+        self._assert_matches_row_by_row(n_neighbors=5)
+
+    def test_distance_weights(self):
+        self._assert_matches_row_by_row(n_neighbors=5, weights="distance")
+
+
+class AnalysisMetricsTests(SimpleTestCase):
+    def test_buckets(self):
+        metrics = AnalysisMetrics()
+        for duration in (0.001, 0.005, 0.007, 0.3, 0.3, 45):
+            metrics.observe("plot", duration)
+
+        stage = metrics.snapshot()["stages"]["plot"]
+
+        self.assertEqual(stage["count"], 6)
+        self.assertAlmostEqual(stage["sum"], 45.613)
+        # the buckets are cumulative and their upper bounds inclusive
+        buckets = stage["buckets"]
+        self.assertEqual(buckets["0.005"], 2)
+        self.assertEqual(buckets["0.01"], 3)
+        self.assertEqual(buckets["0.25"], 3)
+        self.assertEqual(buckets["0.5"], 5)
+        self.assertEqual(buckets["30"], 5)
+        self.assertEqual(buckets["+Inf"], 6)
+
+    def test_stages_and_counters(self):
+        metrics = AnalysisMetrics()
+        metrics.observe("plot", 0.1)
+        metrics.observe("table", 0.2)
+        metrics.increment("analyses")
+        metrics.increment("analyses")
+        metrics.increment("heartbeats", 30)
+
+        snapshot = metrics.snapshot()
+
+        self.assertEqual(snapshot["counters"], {"analyses": 2, "heartbeats": 30})
+        self.assertEqual(snapshot["stages"]["plot"]["count"], 1)
+        self.assertEqual(snapshot["stages"]["table"]["count"], 1)
+
+    def test_snapshot_is_a_copy(self):
+        metrics = AnalysisMetrics()
+        metrics.increment("analyses")
+        snapshot = metrics.snapshot()
+
+        metrics.increment("analyses")
+        metrics.observe("plot", 0.1)
+
+        self.assertEqual(snapshot["counters"], {"analyses": 1})
+        self.assertEqual(snapshot["stages"], {})
+
+
+class AnalyzerStageTimingTests(SimpleTestCase):
+    def test_inference_stages_are_batch_stages(self):
+        analyzer = ECGAnalyzer(None, None, use_label_table=True)
+
+        def infer_batch(*features):
+            with analyzer._measure_stage("clustering"):
+                pass
+            return features
+
+        with mock.patch.object(analyzer, "_infer_batch", side_effect=infer_batch):
+            with analyzer._measure_stage("load_models"):
+                analyzer._infer(np.zeros(1), np.zeros(1), np.zeros(1))
+
+        self.assertEqual(
+            list(analyzer.stage_timings), ["batch_clustering", "load_models"]
+        )
+        self.assertRegex(
+            analyzer.get_server_timing(),
+            r"^batch_clustering;dur=\d+\.\d, load_models;dur=\d+\.\d$",
+        )
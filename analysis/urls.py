@@ -7,4 +7,10 @@ app_name = AnalysisConfig.name
 
 urlpatterns = [
     path("session/", views.AnalysisSessionView.as_view(), name="session-create"),
+    path(
+        "session/<uuid:pk>/",
+        views.AnalysisSessionRetrieveView.as_view(),
+        name="session-retrieve",
+    ),
+    path("metrics/", views.AnalysisMetricsView.as_view(), name="metrics"),
 ]
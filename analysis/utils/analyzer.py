@@ -1,66 +1,180 @@
+from contextlib import contextmanager
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from django.conf import settings
 
 from analysis.constants import HEARTBEAT_LABEL_VERBOSE
+from analysis.utils.dispatcher import inference_dispatcher
 from analysis.utils.functions import extract_heartbeats_and_waves
+from analysis.utils.metrics import analysis_metrics
+from common.utils.profiling import measure
 from modelling.data_preparation.manager import MITDBDatasetManager
 from modelling.data_preparation.utils import (
-    concatenate_letters,
-    convert_labels_to_letters,
     extract_wave_features,
+    gather_word_vectors,
+    word_ids_to_vectors,
+    word_ids_to_words,
 )
 
+TABLE_ROWS_NUMBER = 20
+
 
 class ECGAnalyzer:
-    def __init__(self, analysis_session, training_session):
+    def __init__(self, analysis_session, training_session, use_label_table=None):
         self._analysis_session = analysis_session
         self._training_session = training_session
 
+        # the full word2vec and classifier path is kept for validation
+        self._use_label_table = (
+            settings.ANALYSIS_USE_LABEL_TABLE
+            if use_label_table is None
+            else use_label_table
+        )
+
+        # wall time (seconds) of every stage of this analysis, in order
+        self.stage_timings = {}
+        self._stage_prefix = ""
+
     def get_analysis_result(self):
-        df = pd.read_csv(self._analysis_session.ecg_file)
-        ecg_signal = df["signal"].values
+        analysis_metrics.increment("analyses")
+        try:
+            with self._measure_stage("total"):
+                result = self._analyze()
+        except Exception:
+            analysis_metrics.increment("analysis_errors")
+            raise
+
+        for stage, duration in self.stage_timings.items():
+            analysis_metrics.observe(stage, duration)
+
+        return result
+
+    def get_server_timing(self):
+        # the value of a Server-Timing header, durations are in milliseconds
+        return ", ".join(
+            f"{stage};dur={duration * 1000:.1f}"
+            for stage, duration in self.stage_timings.items()
+        )
+
+    def _analyze(self):
+        with self._measure_stage("read_csv"):
+            df = pd.read_csv(self._analysis_session.ecg_file)
+            ecg_signal = df["signal"].values
 
         (
             heartbeat_intervals,
-            p_wave_features_scaled,
-            qrs_complex_features_scaled,
-            t_wave_features_scaled,
+            p_wave_features,
+            qrs_complex_features,
+            t_wave_features,
         ) = self._prepare_features(ecg_signal)
+        analysis_metrics.increment("heartbeats", len(heartbeat_intervals))
+
+        # includes the wait for the other requests of a micro-batch
+        with self._measure_stage("inference"):
+            word_ids, predicted_labels = inference_dispatcher.submit(
+                f"{self._training_session.id}:{self._use_label_table}",
+                self._infer,
+                p_wave_features,
+                qrs_complex_features,
+                t_wave_features,
+            )
 
-        words = self._generate_words(
-            p_wave_features_scaled, qrs_complex_features_scaled, t_wave_features_scaled
-        )
-
-        vectors = self._generate_vectors(words)
-
-        predicted_labels = self._predict_labels(vectors)
+        with self._measure_stage("plot"):
+            chart = self.__plot_ecg_with_annotations(
+                ecg_signal, heartbeat_intervals, predicted_labels
+            )
 
-        chart = self.__plot_ecg_with_annotations(
-            ecg_signal, heartbeat_intervals, predicted_labels
-        )
+        with self._measure_stage("table"):
+            table_word_ids = word_ids[:TABLE_ROWS_NUMBER]
+            table_vectors = self._generate_vectors(table_word_ids)
+            table = self.__generate_heartbeats_table_data(
+                predicted_labels, table_word_ids, table_vectors
+            )
 
         return {
             "charts": {"line": chart},
-            "table": self.__generate_heartbeats_table_data(
-                predicted_labels, words, vectors
-            ),
+            "table": table,
         }
 
+    @contextmanager
+    def _measure_stage(self, stage):
+        stage = f"{self._stage_prefix}{stage}"
+        with measure() as stats:
+            yield
+
+        # stages entered more than once (e.g. model loading) are summed up
+        self.stage_timings[stage] = (
+            self.stage_timings.get(stage, 0) + stats["wall_time"]
+        )
 
     def _prepare_features(self, ecg_signal):
-        (
-            heartbeats,
+        with self._measure_stage("detect_waves"):
+            (
+                heartbeats,
+                heartbeat_intervals,
+                p_waves,
+                qrs_complexes,
+                t_waves,
+            ) = extract_heartbeats_and_waves(ecg_signal, fs=self._analysis_session.fs)
+
+        with self._measure_stage("wave_features"):
+            (
+                p_wave_features,
+                qrs_complex_features,
+                t_wave_features,
+            ) = extract_wave_features(p_waves, qrs_complexes, t_waves)
+
+        return (
             heartbeat_intervals,
-            p_waves,
-            qrs_complexes,
-            t_waves,
-        ) = extract_heartbeats_and_waves(ecg_signal, fs=self._analysis_session.fs)
+            p_wave_features,
+            qrs_complex_features,
+            t_wave_features,
+        )
+
+    def _infer(self, p_wave_features, qrs_complex_features, t_wave_features):
+        # Runs once per micro-batch, on the analyzer of the request leading it. Its
+        # stages cover the heartbeats of the whole batch, so they are kept apart
+        # from the stages of the request as batch_* stages
+        analysis_metrics.increment("inference_batches")
+        self._stage_prefix = "batch_"
+        try:
+            return self._infer_batch(
+                p_wave_features, qrs_complex_features, t_wave_features
+            )
+        finally:
+            self._stage_prefix = ""
+
+    def _infer_batch(self, p_wave_features, qrs_complex_features, t_wave_features):
+        with self._measure_stage("scale_features"):
+            (
+                p_wave_features_scaled,
+                qrs_complex_features_scaled,
+                t_wave_features_scaled,
+            ) = self._scale_features(
+                p_wave_features, qrs_complex_features, t_wave_features
+            )
 
-        p_wave_features, qrs_complex_features, t_wave_features = extract_wave_features(
-            p_waves, qrs_complexes, t_waves
+        word_ids = self._generate_word_ids(
+            p_wave_features_scaled, qrs_complex_features_scaled, t_wave_features_scaled
         )
 
+        label_table = self._get_label_table()
+        if label_table is not None:
+            with self._measure_stage("lookup_labels"):
+                return word_ids, self._lookup_labels(label_table, word_ids)
+
+        with self._measure_stage("word2vec"):
+            vectors = self._generate_vectors(word_ids)
+
+        with self._measure_stage("predict_labels"):
+            predicted_labels = self._predict_labels(word_ids, vectors)
+
+        return word_ids, predicted_labels
+
+    @staticmethod
+    def _scale_features(p_wave_features, qrs_complex_features, t_wave_features):
         dataset_manager = MITDBDatasetManager()
         scaler_p, scaler_qrs, scaler_t = dataset_manager.load_scalers_from_cache()
 
@@ -68,44 +182,77 @@ class ECGAnalyzer:
         qrs_complex_features_scaled = scaler_qrs.transform(qrs_complex_features)
         t_wave_features_scaled = scaler_t.transform(t_wave_features)
         return (
-            heartbeat_intervals,
             p_wave_features_scaled,
             qrs_complex_features_scaled,
             t_wave_features_scaled,
         )
 
-    def _generate_words(self, p_wave_features, qrs_complex_features, t_wave_features):
-        kmeans_p, kmeans_qrs, kmeans_t = self._training_session.get_kmeans_models()
+    def _generate_word_ids(
+        self, p_wave_features, qrs_complex_features, t_wave_features
+    ):
+        with self._measure_stage("load_models"):
+            kmeans_p, kmeans_qrs, kmeans_t = self._training_session.get_kmeans_models()
 
-        labels_p = kmeans_p.predict(p_wave_features)
-        labels_qrs = kmeans_qrs.predict(qrs_complex_features)
-        labels_t = kmeans_t.predict(t_wave_features)
+        with self._measure_stage("clustering"):
+            labels_p = self.__predict_clusters(kmeans_p, p_wave_features)
+            labels_qrs = self.__predict_clusters(kmeans_qrs, qrs_complex_features)
+            labels_t = self.__predict_clusters(kmeans_t, t_wave_features)
 
-        letters_p = convert_labels_to_letters(labels_p)
-        letters_qrs = convert_labels_to_letters(labels_qrs)
-        letters_t = convert_labels_to_letters(labels_t)
+        # words are kept as cluster ids, letters are only needed for the table
+        return np.column_stack((labels_p, labels_qrs, labels_t))
 
-        heartbeat_words = concatenate_letters(letters_p, letters_qrs, letters_t)
-        return heartbeat_words
+    def _generate_vectors(self, word_ids):
+        label_table = self._get_label_table()
+        if label_table is not None:
+            return gather_word_vectors(word_ids, label_table["letter_vectors"])
 
-    def _generate_vectors(self, words):
-        word2vec = self._training_session.get_word2vec_model()
+        with self._measure_stage("load_models"):
+            word2vec = self._training_session.get_word2vec_model()
 
-        def word_to_vec(word):
-            return np.mean([word2vec.wv[letter] for letter in word], axis=0)
+        return word_ids_to_vectors(word_ids, word2vec)
 
-        word_vectors = [word_to_vec(w) for w in words]
-        return word_vectors
+    def _get_label_table(self):
+        if not self._use_label_table:
+            return None
 
-    def _predict_labels(self, vectors):
-        classifier = self._training_session.get_classifier_model()
+        with self._measure_stage("load_models"):
+            return self._training_session.get_label_table()
 
-        predicted_labels = [classifier.predict(f.reshape(1, -1)) for f in vectors]
-        predicted_labels_expanded = [
-            HEARTBEAT_LABEL_VERBOSE[label[0]] for label in predicted_labels
+    @staticmethod
+    def _lookup_labels(label_table, word_ids):
+        label_ids = label_table["label_ids"][
+            word_ids[:, 0], word_ids[:, 1], word_ids[:, 2]
         ]
+        labels_expanded = np.array(
+            [HEARTBEAT_LABEL_VERBOSE[label] for label in label_table["labels"]]
+        )
+
+        return labels_expanded[label_ids].tolist()
 
-        return predicted_labels_expanded
+    def _predict_labels(self, word_ids, vectors):
+        with self._measure_stage("load_models"):
+            classifier = self._training_session.get_classifier_model()
+
+        # Heartbeats share a small set of words, so every distinct word is classified
+        # once. Rows are predicted one by one: batched knn distances differ in the
+        # last bits and may break ties between identical training vectors differently
+        _, word_indices, inverse = np.unique(
+            word_ids, axis=0, return_index=True, return_inverse=True
+        )
+        predicted_labels = [
+            HEARTBEAT_LABEL_VERBOSE[classifier.predict(vectors[i : i + 1])[0]]
+            for i in word_indices
+        ]
+        predicted_labels_expanded = np.array(predicted_labels)[inverse.reshape(-1)]
+
+        return predicted_labels_expanded.tolist()
+
+    @staticmethod
+    def __predict_clusters(kmeans, features):
+        # models fitted on the float32 feature store expect float32 input
+        return kmeans.predict(
+            features.astype(kmeans.cluster_centers_.dtype, copy=False)
+        )
 
     @staticmethod
     def __plot_ecg_with_annotations(
@@ -163,14 +310,17 @@ class ECGAnalyzer:
 
     @staticmethod
     def __generate_heartbeats_table_data(
-        predicted_labels_expanded, heartbeat_words, features
+        predicted_labels_expanded, heartbeat_word_ids, features
     ):
+        rows_number = len(heartbeat_word_ids)
+        heartbeat_words = word_ids_to_words(heartbeat_word_ids)
+
         return [
             {
                 "index": i + 1,
                 "predicted_label": predicted_labels_expanded[i],
                 "word": heartbeat_words[i],
-                "word_vector": features[i],
+                "word_vector": features[i].tolist(),
             }
-            for i in range(min(20, len(predicted_labels_expanded)))
+            for i in range(rows_number)
         ]
@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+
+
+class InferenceBatchError(Exception):
+    pass
+
+
+class _Batch:
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.closed = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+# Collects the heartbeats of concurrent requests for the same key (training
+# session) during a short window and runs the inference once for all of them.
+# The first request of a batch waits for the window and runs the inference,
+# the others wait for its results and take their own slices.
+class InferenceDispatcher:
+    def __init__(self, max_batch_size, max_wait):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, infer, *features):
+        size = len(features[0])
+        if self.max_wait <= 0:
+            return infer(*features)
+
+        with self._lock:
+            batch = self._batches.get(key)
+            if batch is not None and batch.size + size > self.max_batch_size:
+                self._close(key, batch)
+                batch = None
+
+            is_leader = batch is None
+            if is_leader:
+                batch = self._batches[key] = _Batch()
+
+            offset = batch.size
+            batch.parts.append(features)
+            batch.size += size
+
+            if batch.size >= self.max_batch_size:
+                self._close(key, batch)
+
+        if is_leader:
+            batch.closed.wait(self.max_wait)
+            with self._lock:
+                self._close(key, batch)
+            self._run(batch, infer)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            if is_leader:
+                raise batch.error
+            # every follower raises an exception of its own, raising the shared one
+            # from several threads would mix their tracebacks into it
+            raise InferenceBatchError(
+                "The inference of the batch failed"
+            ) from batch.error
+
+        return tuple(result[offset : offset + size] for result in batch.results)
+
+    def _close(self, key, batch):
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+        batch.closed.set()
+
+    @staticmethod
+    def _run(batch, infer):
+        try:
+            if len(batch.parts) == 1:
+                batch.results = infer(*batch.parts[0])
+            else:
+                batch.results = infer(
+                    *(np.concatenate(arrays) for arrays in zip(*batch.parts))
+                )
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
+
+
+inference_dispatcher = InferenceDispatcher(
+    max_batch_size=settings.INFERENCE_BATCH_MAX_SIZE,
+    max_wait=settings.INFERENCE_BATCH_MAX_WAIT_MS / 1000,
+)
@@ -1,49 +1,34 @@
 import numpy as np
 
-from biosppy.signals import ecg
+from modelling.data_preparation.utils import detect_rpeaks, get_heartbeat_boundaries
 
 
 def extract_heartbeats_and_waves(ecg_signal, fs: int = 360):
-    heartbeats = []
-    heartbeat_intervals = []
-
-    p_waves = []
-    qrs_complexes = []
-    t_waves = []
-
-    out = ecg.ecg(signal=ecg_signal, sampling_rate=fs, show=False)
-    rpeaks = out["rpeaks"]
+    rpeaks = detect_rpeaks(ecg_signal, fs)
     rr_intervals = np.diff(rpeaks)
     average_rr_interval = np.mean(rr_intervals)
 
     signal_len = len(ecg_signal)
 
-    for r_peak in rpeaks:
-        start, end = (
-            max(int(r_peak - average_rr_interval * 0.3), 0),
-            min(int(r_peak + average_rr_interval * 0.5), signal_len - 1),
-        )
-
-        heartbeat = ecg_signal[start:end]
-
-        # Skip heartbeats below a certain length threshold
-        if len(heartbeat) < average_rr_interval * 0.5:
-            continue
+    starts, ends, p_wave_ends, qrs_complex_ends = get_heartbeat_boundaries(
+        rpeaks, average_rr_interval, signal_len
+    )
 
-        # Append the heartbeat and corresponding interval
-        heartbeats.append(heartbeat)
-        heartbeat_intervals.append((start, end))
+    # Skip heartbeats below a certain length threshold
+    keep = ends - starts >= average_rr_interval * 0.5
 
-        # Simple approach to extract P-waves, QRS complexes, and T-waves in the range of the heartbeat
-        p_wave_end = start + int((end - start) * 0.2)
-        qrs_complex_end = p_wave_end + int((end - start) * 0.4)
+    starts, ends, p_wave_ends, qrs_complex_ends = (
+        starts[keep].tolist(),
+        ends[keep].tolist(),
+        p_wave_ends[keep].tolist(),
+        qrs_complex_ends[keep].tolist(),
+    )
 
-        p_wave = ecg_signal[start:p_wave_end]
-        qrs_complex = ecg_signal[p_wave_end:qrs_complex_end]
-        t_wave = ecg_signal[qrs_complex_end:end]
+    heartbeats = [ecg_signal[s:e] for s, e in zip(starts, ends)]
+    heartbeat_intervals = list(zip(starts, ends))
 
-        p_waves.append(p_wave)
-        qrs_complexes.append(qrs_complex)
-        t_waves.append(t_wave)
+    p_waves = [ecg_signal[s:e] for s, e in zip(starts, p_wave_ends)]
+    qrs_complexes = [ecg_signal[s:e] for s, e in zip(p_wave_ends, qrs_complex_ends)]
+    t_waves = [ecg_signal[s:e] for s, e in zip(qrs_complex_ends, ends)]
 
     return heartbeats, heartbeat_intervals, p_waves, qrs_complexes, t_waves
@@ -0,0 +1,61 @@
+import bisect
+import os
+import threading
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        # the buckets are cumulative, the last one holds every observation
+        buckets, total = {}, 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.counts):
+            total += count
+            buckets[str(bound)] = total
+
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+# Stage latencies and counters of the analyses run by this process. Every gunicorn
+# worker and celery process keeps its own, nothing is shared or persisted.
+class AnalysisMetrics:
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, duration):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _Histogram()
+            histogram.observe(duration)
+
+    def increment(self, counter, value=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "counters": dict(self._counters),
+                "stages": {
+                    stage: histogram.to_dict()
+                    for stage, histogram in self._histograms.items()
+                },
+            }
+
+
+analysis_metrics = AnalysisMetrics()
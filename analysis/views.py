@@ -1,13 +1,22 @@
+from django.db import transaction
 from rest_framework.exceptions import NotFound, ValidationError
-from rest_framework.generics import GenericAPIView
+from rest_framework.fields import BooleanField
+from rest_framework.generics import GenericAPIView, RetrieveAPIView
 from rest_framework.response import Response
+from rest_framework.status import HTTP_202_ACCEPTED
 from rest_framework.views import APIView
 
 from modelling.models import TrainingSession
 
+from .constants.enums import AnalysisSessionStatus
 from .models import AnalysisSession
-from .serializers.analysis_session import AnalysisSessionSerializer
+from .serializers.analysis_session import (
+    AnalysisSessionResultSerializer,
+    AnalysisSessionSerializer,
+)
+from .tasks import q_analyze_ecg
 from .utils.analyzer import ECGAnalyzer
+from .utils.metrics import analysis_metrics
 
 
 class AnalysisSessionView(GenericAPIView):
@@ -17,14 +26,39 @@ class AnalysisSessionView(GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        analysis_session = serializer.save()
-
         training_session = self._get_training_session()
+        is_async = self._is_async()
+
+        analysis_session = serializer.save(training_session=training_session)
+
+        if is_async:
+            analysis_session_id_str = str(analysis_session.id)
+
+            transaction.on_commit(lambda: q_analyze_ecg.delay(analysis_session_id_str))
+            analysis_metrics.increment("analyses_enqueued")
+
+            return Response(
+                {"id": analysis_session_id_str, "status": analysis_session.status},
+                status=HTTP_202_ACCEPTED,
+            )
 
         analyzer = ECGAnalyzer(analysis_session, training_session)
-        data = analyzer.get_analysis_result()
+        try:
+            data = analyzer.get_analysis_result()
+        except Exception as e:
+            analysis_session.status = AnalysisSessionStatus.FAILED
+            analysis_session.error = f"{e.__class__.__name__}: {e}"
+            analysis_session.save(update_fields=["status", "error", "modified_at"])
+            raise
+
+        # the result is only returned, the client of the fast path does not poll it
+        analysis_session.status = AnalysisSessionStatus.DONE
+        analysis_session.save(update_fields=["status", "modified_at"])
 
-        return Response(data)
+        return Response(
+            {"id": str(analysis_session.id), **data},
+            headers={"Server-Timing": analyzer.get_server_timing()},
+        )
 
     def _get_training_session(self):
         training_session_id = self.request.data.get("training_session_id")
@@ -37,3 +71,25 @@ class AnalysisSessionView(GenericAPIView):
             )
 
         return training_session
+
+    def _is_async(self):
+        # analyses are run by the celery worker only when asked for
+        is_async = self.request.data.get("async")
+        if is_async is None:
+            return False
+
+        try:
+            return BooleanField().to_internal_value(is_async)
+        except ValidationError as e:
+            raise ValidationError({"async": e.detail})
+
+
+class AnalysisSessionRetrieveView(RetrieveAPIView):
+    queryset = AnalysisSession.objects.all()
+    serializer_class = AnalysisSessionResultSerializer
+
+
+class AnalysisMetricsView(APIView):
+    # stage latency histograms and counters of this worker process only
+    def get(self, request):
+        return Response(analysis_metrics.snapshot())
@@ -0,0 +1,13 @@
+#!/bin/sh
+
+# Local stand-in deployment for load testing, no PostgreSQL, Redis or nginx needed.
+# Uses the MIT-BIH feature cache prepared by initial_setup.
+export DJANGO_SETTINGS_MODULE=EcgAnalysis.settings_loadtest
+
+python manage.py migrate
+python manage.py create_cache_folders
+python manage.py initial_setup
+
+echo "Training session id: $(python manage.py create_training_session --algorithm "${LOADTEST_ALGORITHM:-knn}")"
+
+exec gunicorn EcgAnalysis.wsgi:application --bind 127.0.0.1:8000 --workers "${LOADTEST_WORKERS:-1}"
@@ -0,0 +1,91 @@
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def get_rss():
+    # Resident set size of the process in bytes, None without procfs
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def get_max_rss():
+    # Peak resident set size of the whole process lifetime in bytes, ru_maxrss is
+    # reported in bytes on macOS and in kilobytes elsewhere
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class RSSSampler:
+    # Samples the resident set size in a background thread, which also catches the
+    # memory of native code that tracemalloc does not see
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_rss = None
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._sample()
+        # nothing to sample without procfs
+        if self.peak_rss is not None:
+            self._thread.start()
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+
+        return self.peak_rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = get_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+
+
+@contextmanager
+def measure(trace_memory=False, sample_rss=False):
+    # The yielded dict is filled in when the block exits
+    stats = {}
+
+    if trace_memory:
+        tracemalloc.start()
+
+    if sample_rss:
+        sampler = RSSSampler()
+        sampler.start()
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield stats
+    finally:
+        stats["wall_time"] = time.perf_counter() - wall_start
+        stats["cpu_time"] = time.process_time() - cpu_start
+
+        if trace_memory:
+            stats["peak_memory"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        if sample_rss:
+            peak_rss = sampler.stop()
+            if peak_rss is not None:
+                stats["peak_rss"] = peak_rss
+            else:
+                # not the peak of the block, every block reports the same one
+                stats["lifetime_peak_rss"] = get_max_rss()
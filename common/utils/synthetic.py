@@ -0,0 +1,44 @@
+import numpy as np
+
+# (offset from the R peak in seconds, amplitude in mV, width in seconds)
+# of the P, Q, R, S and T waves of a synthetic heartbeat
+HEARTBEAT_WAVES = (
+    (-0.2, 0.15, 0.025),
+    (-0.03, -0.1, 0.01),
+    (0.0, 1.0, 0.012),
+    (0.03, -0.2, 0.01),
+    (0.25, 0.3, 0.04),
+)
+
+
+def generate_ecg_signal(duration, fs=360, heart_rate=75, noise=0.02, seed=None):
+    rng = np.random.default_rng(seed)
+
+    signal_len = int(duration * fs)
+    signal = np.zeros(signal_len)
+
+    # R peak positions with a slightly varying RR interval
+    rr_interval = 60 / heart_rate
+    r_peaks = []
+    r_peak = rr_interval / 2
+    while r_peak < duration - rr_interval / 2:
+        r_peaks.append(r_peak)
+        r_peak += rr_interval * (1 + 0.05 * rng.standard_normal())
+
+    for r_peak in r_peaks:
+        for offset, amplitude, width in HEARTBEAT_WAVES:
+            center = r_peak + offset
+            start = max(int((center - 5 * width) * fs), 0)
+            end = min(int((center + 5 * width) * fs), signal_len)
+
+            t = np.arange(start, end) / fs
+            signal[start:end] += amplitude * np.exp(
+                -((t - center) ** 2) / (2 * width**2)
+            )
+
+    # baseline wander and measurement noise
+    t = np.arange(signal_len) / fs
+    signal += 0.05 * np.sin(2 * np.pi * 0.3 * t)
+    signal += noise * rng.standard_normal(signal_len)
+
+    return signal, (np.array(r_peaks) * fs).astype(int)
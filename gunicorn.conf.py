@@ -0,0 +1,19 @@
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", 3))
+# more than one thread switches to the gthread worker, which lets concurrent
+# analysis requests be batched, see INFERENCE_BATCH_MAX_WAIT_MS
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+
+# Load the application, heavy modules and models in the master before forking,
+# so that the workers share these pages copy-on-write
+preload_app = os.getenv("PRELOAD_MODELS", "true").lower() in ("1", "true", "yes")
+
+
+def when_ready(server):
+    # objects allocated during warm-up are moved out of the garbage collector's
+    # reach, so collections in the workers do not write to the shared pages
+    if preload_app:
+        gc.freeze()
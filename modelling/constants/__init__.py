@@ -9,6 +9,8 @@ SCALER = "scaler"
 KMEANS = "kmeans"
 WORD2VEC = "word2vec"
 CLASSIFIER = "classifier"
+LABEL_TABLE = "label_table"
+ALPHABETS = "alphabets"
 
 MODELLING_APP_DIR = os.path.join(settings.BASE_DIR, ModellingConfig.name)
 
@@ -17,9 +19,14 @@ SCALER_MODELS_CACHE_DIR = os.path.join(MODELS_CACHE_DIR, SCALER)
 KMEANS_MODELS_CACHE_DIR = os.path.join(MODELS_CACHE_DIR, KMEANS)
 WORD2VEC_MODELS_CACHE_DIR = os.path.join(MODELS_CACHE_DIR, WORD2VEC)
 CLASSIFIER_MODELS_CACHE_DIR = os.path.join(MODELS_CACHE_DIR, CLASSIFIER)
+LABEL_TABLE_MODELS_CACHE_DIR = os.path.join(MODELS_CACHE_DIR, LABEL_TABLE)
+ALPHABETS_CACHE_DIR = os.path.join(MODELS_CACHE_DIR, ALPHABETS)
 
 DATA_PREPARATION_CACHE_DIR = os.path.join(
     MODELLING_APP_DIR, "data_preparation", "cache"
 )
 MITDB_DATASET_DIR = os.path.join(DATA_PREPARATION_CACHE_DIR, "datasets", MITDB)
 MITDB_FEATURES_DIR = os.path.join(DATA_PREPARATION_CACHE_DIR, "features", MITDB)
+MITDB_RECORDS_CACHE_DIR = os.path.join(DATA_PREPARATION_CACHE_DIR, "records", MITDB)
+MITDB_RPEAKS_CACHE_DIR = os.path.join(DATA_PREPARATION_CACHE_DIR, "rpeaks", MITDB)
+MITDB_FEATURES_MANIFEST = os.path.join(MITDB_FEATURES_DIR, "manifest.json")
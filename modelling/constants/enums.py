@@ -7,8 +7,23 @@ class ClassificationAlgorithm(str, ChoicesEnum):
     RANDOM_FOREST = "random_forest"
 
 
+class ClusteringAlgorithm(str, ChoicesEnum):
+    KMEANS = "kmeans"
+    MINIBATCH_KMEANS = "minibatch_kmeans"
+
+
+class SilhouetteMethod(str, ChoicesEnum):
+    EXACT = "exact"
+    SAMPLED = "sampled"
+
+
 class TrainingSessionStatus(str, ChoicesEnum):
     INITIALIZED = "initialized"
     TRAINING = "training"
     EVALUATION = "evaluation"
     DONE = "done"
+
+
+class RPeakDetectionMode(str, ChoicesEnum):
+    FULL = "full"
+    LIGHT = "light"
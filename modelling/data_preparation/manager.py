@@ -1,13 +1,19 @@
+import glob
+import hashlib
+import json
 import logging
 import os
-import pickle
 import random
+import zipfile
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
+import biosppy
 import joblib
 import numpy as np
 import wfdb
-from biosppy.signals import ecg
+from django.conf import settings
 from sklearn.preprocessing import StandardScaler
 from tqdm import tqdm
 
@@ -15,123 +21,182 @@ from modelling.constants import (
     MITDB,
     MITDB_DATASET_DIR,
     MITDB_FEATURES_DIR,
+    MITDB_FEATURES_MANIFEST,
+    MITDB_RECORDS_CACHE_DIR,
+    MITDB_RPEAKS_CACHE_DIR,
     SCALER_MODELS_CACHE_DIR,
 )
-from modelling.data_preparation.utils import extract_wave_features
+from modelling.data_preparation.utils import (
+    detect_rpeaks,
+    extract_wave_features,
+    get_heartbeat_boundaries,
+    match_annotations,
+)
+from modelling.utils.model_cache import model_cache
 
 logger = logging.getLogger("ecg_analysis")
 
+FEATURES_STORE_VERSION = 2
+
+# Bump whenever heartbeat extraction or wave feature computation changes,
+# so that the per-record caches get recomputed
+FEATURES_EXTRACTION_VERSION = 2
+
+# Only this channel of the MIT-BIH records is analysed and read from disk
+MITDB_CHANNEL = 1
+
+RECORD_FEATURES = (
+    "heartbeat_intervals",
+    "heartbeat_annotations",
+    "p_wave",
+    "qrs_complex",
+    "t_wave",
+)
+
 
 class MITDBDatasetManager:
+    def __init__(self, n_jobs=None, full_length=None):
+        self._n_jobs = n_jobs or settings.MITDB_EXTRACTION_WORKERS
+        # None follows the cached feature set, e.g. one built with --full-length
+        self._full_length = full_length
+
     def download_dataset(self):
         if not self._is_dataset_downloaded:
             logger.info("MIT dataset is not found. Starting the download process...")
 
             wfdb.dl_database(MITDB, MITDB_DATASET_DIR)
 
-    def get_records_and_annotations(self):
+    def iter_records_and_annotations(self, record_names=None):
         self.download_dataset()
 
-        records, annotations = [], []
-
-        for i in self._wfdb_indices:
-            kwargs = {"record_name": f"{MITDB_DATASET_DIR}/{i}", "sampto": 500000}
-
-            record = wfdb.rdsamp(**kwargs)
-            annotation = wfdb.rdann(**kwargs, extension="atr")
-
-            records.append(record)
-            annotations.append(annotation)
-
-        return records, annotations
+        for i in record_names or self._wfdb_indices:
+            yield self._read_record(i, self._sampto)
 
     @staticmethod
-    def extract_heartbeats_and_waves_from_records(records, annotations):
-        heartbeats = []
-        heartbeat_annotations = []
-
-        p_waves = []
-        qrs_complexes = []
-        t_waves = []
-
-        for record, annotation in tqdm(
-            zip(records, annotations),
-            total=len(records),
-            desc="Extracting heartbeats, heartbeat annotations and P/QRS/T waves...",
-        ):
-            fs = record[1]["fs"]
-
-            ecg_signal = record[0][:, 1]
-            signal_len = len(ecg_signal)
+    def _read_record(record_name, sampto=None):
+        kwargs = {
+            "record_name": f"{MITDB_DATASET_DIR}/{record_name}",
+            "sampto": sampto,
+        }
 
-            out = ecg.ecg(signal=ecg_signal, sampling_rate=fs, show=False)
-            rpeaks = out["rpeaks"]
-            rr_intervals = np.diff(rpeaks)
-            average_rr_interval = np.mean(rr_intervals)
+        signal, fields = wfdb.rdsamp(**kwargs, channels=[MITDB_CHANNEL])
+        annotation = wfdb.rdann(**kwargs, extension="atr")
 
-            samples = annotation.sample
-            symbols = annotation.symbol
+        # the record only holds the channels that were read, which are kept along
+        fields["channels"] = [MITDB_CHANNEL]
 
-            for r_peak in rpeaks:
-                # define the start and end of a heartbeat
-                start, end = (
-                    max(int(r_peak - average_rr_interval * 0.3), 0),
-                    min(int(r_peak + average_rr_interval * 0.5), signal_len - 1),
-                )
+        return (signal, fields), annotation
 
-                # calculate boundaries for annotations
-                lower_bound, upper_bound = (
-                    max(r_peak - average_rr_interval * 0.2, start),
-                    min(r_peak + average_rr_interval * 0.2, end),
-                )
-
-                # find indices of annotations within boundaries
-                annotation_indices = np.where(
-                    (samples >= lower_bound) & (samples <= upper_bound)
-                )[0]
+    @staticmethod
+    def get_ecg_signal(record, channel=None):
+        signal, fields = record
+        # resolved here rather than in the signature, like in _read_record
+        if channel is None:
+            channel = MITDB_CHANNEL
 
-                # skip if there are no annotations in the range
-                if len(annotation_indices) == 0:
-                    continue
+        # records read by wfdb.rdsamp without channels hold all of them
+        channels = list(fields.get("channels", range(signal.shape[1])))
+        if channel not in channels:
+            raise ValueError(
+                f"Channel {channel} is not among the channels {channels} of the record."
+            )
 
-                # find the closest annotation to the r peak
-                closest_annotated_r_peak = annotation_indices[
-                    np.argmin(np.abs(samples[annotation_indices] - r_peak))
-                ]
+        return signal[:, channels.index(channel)]
 
-                heartbeat = ecg_signal[start:end]
+    @staticmethod
+    def _locate_heartbeats(record, annotation, rpeaks=None, channel=None):
+        fs = record[1]["fs"]
 
-                # Skip '+' annotations
-                heartbeat_annotation = symbols[closest_annotated_r_peak]
-                if heartbeat_annotation == "+":
-                    continue
+        ecg_signal = MITDBDatasetManager.get_ecg_signal(record, channel)
+        signal_len = len(ecg_signal)
 
-                # Skip heartbeats below a certain length threshold
-                if len(heartbeat) < average_rr_interval * 0.5:
-                    continue
+        if rpeaks is None:
+            rpeaks = detect_rpeaks(ecg_signal, fs)
+        rr_intervals = np.diff(rpeaks)
+        average_rr_interval = np.mean(rr_intervals)
 
-                # Append the heartbeat and corresponding annotation
-                heartbeats.append(heartbeat)
-                heartbeat_annotations.append(heartbeat_annotation)
+        starts, ends, p_wave_ends, qrs_complex_ends = get_heartbeat_boundaries(
+            rpeaks, average_rr_interval, signal_len
+        )
 
-                # Simple approach to extract P-waves, QRS complexes, and T-waves in the range of the heartbeat
-                p_wave_end = start + int((end - start) * 0.2)
-                qrs_complex_end = p_wave_end + int((end - start) * 0.4)
+        # find the closest annotation to every r peak
+        annotation_indices = match_annotations(
+            rpeaks, starts, ends, average_rr_interval, annotation.sample
+        )
+        # r peaks without an annotation get an empty symbol, records may have none
+        matched = annotation_indices >= 0
+        annotation_symbols = np.asarray(annotation.symbol, dtype=str)
+        symbols = np.full(len(rpeaks), "", dtype=annotation_symbols.dtype)
+        symbols[matched] = annotation_symbols[annotation_indices[matched]]
+
+        keep = (
+            # skip if there are no annotations in the range
+            matched
+            # Skip '+' annotations
+            & (symbols != "+")
+            # Skip heartbeats below a certain length threshold
+            & (ends - starts >= average_rr_interval * 0.5)
+        )
 
-                p_wave = ecg_signal[start:p_wave_end]
-                qrs_complex = ecg_signal[p_wave_end:qrs_complex_end]
-                t_wave = ecg_signal[qrs_complex_end:end]
+        return (
+            ecg_signal,
+            symbols[keep],
+            starts[keep],
+            ends[keep],
+            p_wave_ends[keep],
+            qrs_complex_ends[keep],
+        )
 
-                p_waves.append(p_wave)
-                qrs_complexes.append(qrs_complex)
-                t_waves.append(t_wave)
+    @staticmethod
+    def _extract_record_features(record, annotation, rpeaks=None):
+        (
+            ecg_signal,
+            heartbeat_annotations,
+            starts,
+            ends,
+            p_wave_ends,
+            qrs_complex_ends,
+        ) = MITDBDatasetManager._locate_heartbeats(record, annotation, rpeaks)
+
+        p_wave_features, qrs_complex_features, t_wave_features = extract_wave_features(
+            [ecg_signal[s:e] for s, e in zip(starts, p_wave_ends)],
+            [ecg_signal[s:e] for s, e in zip(p_wave_ends, qrs_complex_ends)],
+            [ecg_signal[s:e] for s, e in zip(qrs_complex_ends, ends)],
+        )
 
-        return heartbeats, heartbeat_annotations, p_waves, qrs_complexes, t_waves
+        return {
+            "heartbeat_intervals": np.column_stack((starts, ends)),
+            "heartbeat_annotations": heartbeat_annotations,
+            "p_wave": p_wave_features,
+            "qrs_complex": qrs_complex_features,
+            "t_wave": t_wave_features,
+        }
 
     @staticmethod
     def balance_heartbeats_and_waves(
         heartbeats, heartbeat_annotations, p_waves, qrs_complexes, t_waves
     ):
+        indices_to_keep = MITDBDatasetManager._get_balanced_indices(
+            heartbeat_annotations
+        )
+
+        # Create balanced data
+        balanced_heartbeats = [heartbeats[i] for i in indices_to_keep]
+        balanced_annotations = [heartbeat_annotations[i] for i in indices_to_keep]
+        balanced_p_waves = [p_waves[i] for i in indices_to_keep]
+        balanced_qrs_complexes = [qrs_complexes[i] for i in indices_to_keep]
+        balanced_t_waves = [t_waves[i] for i in indices_to_keep]
+
+        return (
+            balanced_heartbeats,
+            balanced_annotations,
+            balanced_p_waves,
+            balanced_qrs_complexes,
+            balanced_t_waves,
+        )
+
+    @staticmethod
+    def _get_balanced_indices(heartbeat_annotations):
         # Get the counter of the annotations
         counter = Counter(heartbeat_annotations)
 
@@ -148,27 +213,12 @@ class MITDBDatasetManager:
             counter["L"],
         )
 
-        indices_to_keep = downsampled_N + [
+        return downsampled_N + [
             i
             for i in range(len(heartbeat_annotations))
             if heartbeat_annotations[i] not in ["N"] + low_count_classes
         ]
 
-        # Create balanced data
-        balanced_heartbeats = [heartbeats[i] for i in indices_to_keep]
-        balanced_annotations = [heartbeat_annotations[i] for i in indices_to_keep]
-        balanced_p_waves = [p_waves[i] for i in indices_to_keep]
-        balanced_qrs_complexes = [qrs_complexes[i] for i in indices_to_keep]
-        balanced_t_waves = [t_waves[i] for i in indices_to_keep]
-
-        return (
-            balanced_heartbeats,
-            balanced_annotations,
-            balanced_p_waves,
-            balanced_qrs_complexes,
-            balanced_t_waves,
-        )
-
     @staticmethod
     def scale_wave_features(p_wave_features, qrs_complex_features, t_wave_features):
         scaler_p = StandardScaler()
@@ -209,62 +259,80 @@ class MITDBDatasetManager:
         qrs_complex_features,
         t_wave_features,
         heartbeat_annotations,
+        extraction_key=None,
+        full_length=False,
     ):
         features = {
             "p_wave": p_wave_features,
             "qrs_complex": qrs_complex_features,
             "t_wave": t_wave_features,
-            "heartbeat_annotations": heartbeat_annotations,
         }
 
+        # annotations are stored as integer codes into the sorted list of labels
+        labels, codes = np.unique(heartbeat_annotations, return_inverse=True)
+
+        manifest = {
+            "version": FEATURES_STORE_VERSION,
+            "extraction_key": extraction_key,
+            "full_length": full_length,
+            "count": len(codes),
+            "labels": labels.tolist(),
+            "features": {},
+        }
+
+        # the balancing samples heartbeats randomly, so the content itself is hashed
+        # to tell the feature sets apart, e.g. in the alphabet cache
+        content_hash = hashlib.sha256(json.dumps(labels.tolist()).encode())
+
         for name, feature in features.items():
-            with open(os.path.join(MITDB_FEATURES_DIR, f"{name}.pkl"), "wb") as f:
-                pickle.dump(feature, f)
+            feature = np.ascontiguousarray(feature, dtype=np.float32)
+            np.save(os.path.join(MITDB_FEATURES_DIR, f"{name}.npy"), feature)
+            content_hash.update(feature.tobytes())
+
+            manifest["features"][name] = {
+                "file": f"{name}.npy",
+                "dtype": feature.dtype.name,
+                "shape": list(feature.shape),
+            }
+
+        codes = codes.astype(np.uint8)
+        np.save(os.path.join(MITDB_FEATURES_DIR, "heartbeat_annotations.npy"), codes)
+        manifest["heartbeat_annotations"] = {"file": "heartbeat_annotations.npy"}
+
+        content_hash.update(codes.tobytes())
+        manifest["featureset_key"] = content_hash.hexdigest()[:16]
+
+        # the manifest is written last, so a partially written store is never used
+        manifest_tmp_path = f"{MITDB_FEATURES_MANIFEST}.tmp"
+        with open(manifest_tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_tmp_path, MITDB_FEATURES_MANIFEST)
 
     def cache_features(self):
         if self._is_featureset_cached:
             return
 
-        records, annotations = self.get_records_and_annotations()
-        logger.info(
-            "MIT dataset records and annotations have been successfully gathered."
-        )
-
-        (
-            heartbeats,
-            heartbeat_annotations,
-            p_waves,
-            qrs_complexes,
-            t_waves,
-        ) = self.extract_heartbeats_and_waves_from_records(records, annotations)
-        logger.info(
-            "MIT dataset heartbeats, heartbeat waves, corresponding annotations have been successfully extracted."
-        )
-
-        (
-            heartbeats,
-            heartbeat_annotations,
-            p_waves,
-            qrs_complexes,
-            t_waves,
-        ) = self.balance_heartbeats_and_waves(
-            heartbeats,
-            heartbeat_annotations,
-            p_waves,
-            qrs_complexes,
-            t_waves,
-        )
-        logger.info("MIT dataset has been successfully balanced.")
+        self.cache_record_features()
+        logger.info("MIT dataset record features are up to date.")
 
         (
             p_wave_features,
             qrs_complex_features,
             t_wave_features,
-        ) = extract_wave_features(p_waves, qrs_complexes, t_waves)
+            heartbeat_annotations,
+        ) = self.load_record_features_from_cache()
         logger.info(
-            "MIT dataset heartbeat wave features have been successfully extracted."
+            "MIT dataset heartbeat wave features and annotations have been successfully loaded."
         )
 
+        indices_to_keep = self._get_balanced_indices(heartbeat_annotations)
+
+        p_wave_features = p_wave_features[indices_to_keep]
+        qrs_complex_features = qrs_complex_features[indices_to_keep]
+        t_wave_features = t_wave_features[indices_to_keep]
+        heartbeat_annotations = heartbeat_annotations[indices_to_keep]
+        logger.info("MIT dataset has been successfully balanced.")
+
         (
             p_wave_features_scaled,
             qrs_complex_features_scaled,
@@ -293,38 +361,177 @@ class MITDBDatasetManager:
             qrs_complex_features_scaled,
             t_wave_features_scaled,
             heartbeat_annotations,
+            extraction_key=self._extraction_key,
+            full_length=self._sampto is None,
         )
         logger.info("MIT dataset features and annotations were successfully cached.")
 
+    def cache_record_features(self):
+        record_names = [
+            name for name in self._wfdb_indices if not self._is_record_cached(name)
+        ]
+        if not record_names:
+            return
+
+        logger.info(
+            f"Extracting features for {len(record_names)} MIT dataset record(s)..."
+        )
+
+        results = tqdm(
+            self._iter_record_features(record_names),
+            total=len(record_names),
+            desc="Extracting heartbeats and P/QRS/T wave features...",
+        )
+
+        # results are written as they arrive, so only one record is held at a time
+        for name, result in zip(record_names, results):
+            self._cache_record_features(name, result)
+
+    def _iter_record_features(self, record_names):
+        if self._n_jobs > 1:
+            self.download_dataset()
+
+            # workers read their own records, only record names go to the pool
+            with ProcessPoolExecutor(max_workers=self._n_jobs) as executor:
+                yield from executor.map(
+                    partial(
+                        self._read_and_extract_record_features, sampto=self._sampto
+                    ),
+                    record_names,
+                )
+        else:
+            records = self.iter_records_and_annotations(record_names)
+
+            for name, (record, annotation) in zip(record_names, records):
+                rpeaks = self._get_rpeaks(name, record, self._sampto)
+                yield self._extract_record_features(record, annotation, rpeaks)
+
     @staticmethod
-    def load_scalers_from_cache():
-        return (
-            joblib.load(
-                os.path.join(os.path.join(SCALER_MODELS_CACHE_DIR, "scaler_p.pkl"))
-            ),
-            joblib.load(
-                os.path.join(os.path.join(SCALER_MODELS_CACHE_DIR, "scaler_qrs.pkl"))
-            ),
-            joblib.load(
-                os.path.join(os.path.join(SCALER_MODELS_CACHE_DIR, "scaler_t.pkl"))
-            ),
+    def _read_and_extract_record_features(record_name, sampto=None):
+        record, annotation = MITDBDatasetManager._read_record(record_name, sampto)
+        rpeaks = MITDBDatasetManager._get_rpeaks(record_name, record, sampto)
+
+        return MITDBDatasetManager._extract_record_features(record, annotation, rpeaks)
+
+    @staticmethod
+    def _get_rpeaks(record_name, record, sampto=None):
+        # R-peaks only depend on the signal and the detector, so they survive
+        # changes to windowing, balancing or features
+        path = os.path.join(
+            MITDB_RPEAKS_CACHE_DIR,
+            f"{record_name}_{MITDBDatasetManager._get_rpeaks_key(sampto)}.npy",
         )
+        try:
+            return np.load(path)
+        except (OSError, ValueError, EOFError):
+            # missing, or cut short, in which case it is detected again
+            pass
+
+        rpeaks = detect_rpeaks(
+            MITDBDatasetManager.get_ecg_signal(record), record[1]["fs"]
+        )
+
+        MITDBDatasetManager._remove_stale_record_caches(path)
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, rpeaks)
+        os.replace(f"{path}.tmp", path)
+
+        return rpeaks
 
     @staticmethod
-    def load_features_and_annotations_from_cache():
-        with open(os.path.join(MITDB_FEATURES_DIR, "p_wave.pkl"), "rb") as f:
-            p_wave_features = pickle.load(f)  # nosec
+    def _get_rpeaks_key(sampto=None):
+        # full and light detection modes return the same R-peaks, the mode is kept
+        # in the key all the same so that the R-peaks of one are never used by the other
+        params = {
+            "detector": "hamilton",
+            "mode": settings.RPEAK_DETECTION_MODE,
+            "biosppy": biosppy.__version__,
+            "sampto": sampto,
+            "channel": MITDB_CHANNEL,
+        }
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+        return key.hexdigest()[:16]
+
+    def load_record_features_from_cache(self):
+        record_features = []
+
+        for name in self._wfdb_indices:
+            with np.load(self._get_record_cache_path(name)) as data:
+                record_features.append(
+                    (
+                        data["p_wave"],
+                        data["qrs_complex"],
+                        data["t_wave"],
+                        data["heartbeat_annotations"],
+                    )
+                )
+
+        return tuple(np.concatenate(column) for column in zip(*record_features))
+
+    def _is_record_cached(self, record_name):
+        # every array is read, so that a cut short or corrupted cache is rebuilt
+        try:
+            with np.load(self._get_record_cache_path(record_name)) as data:
+                for name in RECORD_FEATURES:
+                    data[name]
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return False
+
+        return True
+
+    def _cache_record_features(self, record_name, record_features):
+        path = self._get_record_cache_path(record_name)
+
+        self._remove_stale_record_caches(path)
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(f, **record_features)
+        os.replace(f"{path}.tmp", path)
 
-        with open(os.path.join(MITDB_FEATURES_DIR, "qrs_complex.pkl"), "rb") as f:
-            qrs_complex_features = pickle.load(f)  # nosec
+    @staticmethod
+    def _remove_stale_record_caches(path):
+        # results of previous parameters for the same record are no longer needed
+        directory, filename = os.path.split(path)
+        record_name, extension = filename.split("_")[0], os.path.splitext(filename)[1]
+
+        for stale_path in glob.glob(
+            os.path.join(directory, f"{record_name}_*{extension}")
+        ):
+            if stale_path != path:
+                os.remove(stale_path)
+
+    def _get_record_cache_path(self, record_name):
+        return os.path.join(
+            MITDB_RECORDS_CACHE_DIR, f"{record_name}_{self._extraction_key}.npz"
+        )
+
+    @staticmethod
+    def load_scalers_from_cache():
+        return tuple(
+            model_cache.load(
+                ("scaler", name), os.path.join(SCALER_MODELS_CACHE_DIR, f"{name}.pkl")
+            )
+            for name in ("scaler_p", "scaler_qrs", "scaler_t")
+        )
 
-        with open(os.path.join(MITDB_FEATURES_DIR, "t_wave.pkl"), "rb") as f:
-            t_wave_features = pickle.load(f)  # nosec
+    @staticmethod
+    def load_features_and_annotations_from_cache():
+        with open(MITDB_FEATURES_MANIFEST) as f:
+            manifest = json.load(f)
+
+        # memory-mapped arrays are shared through the page cache between processes
+        p_wave_features, qrs_complex_features, t_wave_features = (
+            np.load(
+                os.path.join(MITDB_FEATURES_DIR, manifest["features"][name]["file"]),
+                mmap_mode="r",
+            )
+            for name in ("p_wave", "qrs_complex", "t_wave")
+        )
 
-        with open(
-            os.path.join(MITDB_FEATURES_DIR, "heartbeat_annotations.pkl"), "rb"
-        ) as f:
-            heartbeat_annotations = pickle.load(f)  # nosec
+        codes = np.load(
+            os.path.join(MITDB_FEATURES_DIR, manifest["heartbeat_annotations"]["file"]),
+            mmap_mode="r",
+        )
+        heartbeat_annotations = np.array(manifest["labels"])[codes]
 
         return (
             p_wave_features,
@@ -333,13 +540,50 @@ class MITDBDatasetManager:
             heartbeat_annotations,
         )
 
+    @staticmethod
+    def get_featureset_key():
+        # None for missing stores and stores written before the key was added
+        return MITDBDatasetManager._load_manifest().get("featureset_key")
+
+    @staticmethod
+    def _load_manifest():
+        if not os.path.isfile(MITDB_FEATURES_MANIFEST):
+            return {}
+
+        with open(MITDB_FEATURES_MANIFEST) as f:
+            return json.load(f)
+
     @property
     def _is_dataset_downloaded(self):
         return os.path.isdir(MITDB_DATASET_DIR) and len(os.listdir(MITDB_DATASET_DIR))
 
     @property
     def _is_featureset_cached(self):
-        return len(os.listdir(MITDB_FEATURES_DIR)) > 0
+        manifest = self._load_manifest()
+
+        return (
+            manifest.get("version") == FEATURES_STORE_VERSION
+            and manifest.get("extraction_key") == self._extraction_key
+        )
+
+    @property
+    def _sampto(self):
+        full_length = self._full_length
+        if full_length is None:
+            full_length = self._load_manifest().get("full_length", False)
+
+        return None if full_length else settings.MITDB_SAMPTO
+
+    @property
+    def _extraction_key(self):
+        params = {
+            "version": FEATURES_EXTRACTION_VERSION,
+            "sampto": self._sampto,
+            "channel": MITDB_CHANNEL,
+            "rpeaks": self._get_rpeaks_key(self._sampto),
+        }
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+        return key.hexdigest()[:16]
 
     @property
     def _wfdb_indices(self):
@@ -1,5 +1,11 @@
 import numpy as np
 import scipy
+from biosppy.signals import ecg, tools
+from django.conf import settings
+
+from modelling.constants.enums import RPeakDetectionMode
+
+WAVE_FEATURES_NUMBER = 11
 
 
 def to_letter(cluster_num):
@@ -15,28 +21,125 @@ def concatenate_letters(letters_p, letters_qrs, letters_t):
 
 
 def extract_wave_features(p_waves, qrs_complexes, t_waves):
-    p_wave_features = []
-    qrs_complex_features = []
-    t_wave_features = []
-    print("sadfsdf")
-    for p_wave, qrs_complex, t_wave in zip(p_waves, qrs_complexes, t_waves):
-        # Compute features for P-wave
-        p_wave_feature = _compute_features(p_wave)
-        p_wave_features.append(p_wave_feature)
-
-        # Compute features for QRS complex
-        qrs_complex_feature = _compute_features(qrs_complex)
-        qrs_complex_features.append(qrs_complex_feature)
-
-        # Compute features for T-wave
-        t_wave_feature = _compute_features(t_wave)
-        t_wave_features.append(t_wave_feature)
-    print("12234234")
+    p_wave_features = compute_wave_features(p_waves)
+    qrs_complex_features = compute_wave_features(qrs_complexes)
+    t_wave_features = compute_wave_features(t_waves)
+
     return p_wave_features, qrs_complex_features, t_wave_features
 
 
-def word_to_vec(word, word2vec):
-    return np.mean([word2vec.wv[letter] for letter in word], axis=0)
+def compute_wave_features(waves):
+    features = np.empty((len(waves), WAVE_FEATURES_NUMBER))
+    lengths = np.array([len(wave) for wave in waves], dtype=int)
+
+    # waves of the same length are stacked into one block and computed together
+    for length in np.unique(lengths):
+        indices = np.flatnonzero(lengths == length)
+        block = np.stack([waves[i] for i in indices])
+        features[indices] = _compute_features_batch(block)
+
+    return features
+
+
+def detect_rpeaks(ecg_signal, fs, mode=None):
+    mode = RPeakDetectionMode(mode or settings.RPEAK_DETECTION_MODE)
+
+    if mode == RPeakDetectionMode.FULL:
+        return ecg.ecg(signal=ecg_signal, sampling_rate=fs, show=False)["rpeaks"]
+
+    # The same steps as ecg.ecg up to R-peak correction, without the templates,
+    # heart rate and time axes that are never used
+    sampling_rate = float(fs)
+
+    filtered, _, _ = tools.filter_signal(
+        signal=np.array(ecg_signal),
+        ftype="FIR",
+        band="bandpass",
+        order=int(0.3 * sampling_rate),
+        frequency=[3, 45],
+        sampling_rate=sampling_rate,
+    )
+
+    (rpeaks,) = ecg.hamilton_segmenter(signal=filtered, sampling_rate=sampling_rate)
+    (rpeaks,) = ecg.correct_rpeaks(
+        signal=filtered, rpeaks=rpeaks, sampling_rate=sampling_rate, tol=0.05
+    )
+
+    # ecg.ecg only keeps R-peaks with a full template window around them
+    rpeaks = np.sort(rpeaks)
+    before, after = int(0.2 * sampling_rate), int(0.4 * sampling_rate)
+    rpeaks = rpeaks[(rpeaks - before >= 0) & (rpeaks + after <= len(filtered))]
+
+    return rpeaks.astype(int)
+
+
+def get_heartbeat_boundaries(rpeaks, average_rr_interval, signal_len):
+    # define the start and end of every heartbeat
+    starts = np.maximum((rpeaks - average_rr_interval * 0.3).astype(int), 0)
+    ends = np.minimum((rpeaks + average_rr_interval * 0.5).astype(int), signal_len - 1)
+
+    # Simple approach to split heartbeats into P-waves, QRS complexes, and T-waves
+    lengths = ends - starts
+    p_wave_ends = starts + (lengths * 0.2).astype(int)
+    qrs_complex_ends = p_wave_ends + (lengths * 0.4).astype(int)
+
+    return starts, ends, p_wave_ends, qrs_complex_ends
+
+
+def match_annotations(rpeaks, starts, ends, average_rr_interval, samples):
+    # calculate boundaries for annotations
+    lower_bounds = np.maximum(rpeaks - average_rr_interval * 0.2, starts)
+    upper_bounds = np.minimum(rpeaks + average_rr_interval * 0.2, ends)
+
+    if len(samples) == 0:
+        return np.full(len(rpeaks), -1)
+
+    # annotation samples are sorted, so the closest annotation to an r peak is
+    # either the last one before it or the first one at/after it
+    right = np.searchsorted(samples, rpeaks, side="left")
+    left = np.searchsorted(samples, samples[np.maximum(right - 1, 0)], side="left")
+
+    has_right = right < len(samples)
+    has_left = right > 0
+
+    right = np.minimum(right, len(samples) - 1)
+
+    has_right &= samples[right] <= upper_bounds
+    has_left &= samples[left] >= lower_bounds
+
+    # on equal distances prefer the earlier annotation
+    use_left = has_left & (
+        ~has_right | (rpeaks - samples[left] <= samples[right] - rpeaks)
+    )
+
+    # -1 marks r peaks without annotations in the range
+    return np.where(use_left, left, np.where(has_right, right, -1))
+
+
+def word_ids_to_vectors(word_ids, word2vec):
+    # word_ids holds the p wave, qrs complex and t wave cluster ids of every word;
+    # each distinct letter is looked up once and the rows are gathered from it
+    cluster_ids, inverse = np.unique(word_ids, return_inverse=True)
+    letter_vectors = word2vec.wv[convert_labels_to_letters(cluster_ids)]
+
+    return gather_word_vectors(inverse.reshape(word_ids.shape), letter_vectors)
+
+
+def gather_word_vectors(word_ids, letter_vectors):
+    return np.mean(letter_vectors[word_ids], axis=1)
+
+
+def word_ids_to_sentences(word_ids):
+    # word2vec is trained on the letters, one sentence per word
+    letters = np.array(convert_labels_to_letters(range(word_ids.max() + 1)))
+
+    return letters[word_ids].tolist()
+
+
+def word_ids_to_words(word_ids):
+    return concatenate_letters(
+        *(convert_labels_to_letters(cluster_ids) for cluster_ids in word_ids.T)
+    )
 
 
 def _compute_features(wave):
@@ -84,3 +187,72 @@ def _compute_features(wave):
         wave_duration,
         wave_amplitude,
     ]
+
+
+def _compute_features_batch(waves):
+    # Same features as _compute_features, computed along the rows of a 2D block
+    wave_duration = waves.shape[1]
+
+    # Time-domain features
+    mean = np.mean(waves, axis=1)
+    median = np.median(waves, axis=1)
+    std = np.std(waves, axis=1)
+    max_val = np.max(waves, axis=1)
+    min_val = np.min(waves, axis=1)
+    skewness = _skew_batch(waves, mean)
+
+    # The full FFT is kept instead of rfft: the mirrored bins have to be present
+    # for argmax to resolve ties exactly like the per-wave computation
+    fft = np.fft.fft(waves, axis=1)
+
+    # Calculate absolute value of fft to get power spectrum
+    power = np.abs(fft)
+
+    # Normalize power
+    power_normalized = power / np.sum(power, axis=1, keepdims=True)
+
+    # Calculate power spectral density
+    psd = power**2
+
+    # Frequency-domain features
+    spectral_entropy = -np.sum(
+        power_normalized * np.log2(power_normalized + np.finfo(float).eps), axis=1
+    )
+    spectral_centroid = np.sum(np.arange(1, wave_duration + 1) * psd, axis=1) / np.sum(
+        psd, axis=1
+    )
+    fundamental_freq = np.argmax(power, axis=1)
+
+    # Waveform characteristics
+    wave_amplitude = max_val - min_val
+
+    return np.column_stack(
+        (
+            mean,
+            median,
+            std,
+            max_val,
+            min_val,
+            skewness,
+            spectral_entropy,
+            spectral_centroid,
+            fundamental_freq,
+            np.full(len(waves), wave_duration),
+            wave_amplitude,
+        )
+    )
+
+
+def _skew_batch(waves, mean):
+    # scipy.stats.skew along the rows, with m2 ** 1.5 taken one wave at a time:
+    # numpy's vectorized pow may differ in the last bit from the scalar pow that
+    # scipy.stats.skew ends up with for a single wave
+    zero_mean = waves - mean[:, np.newaxis]
+    m2 = np.mean(zero_mean**2, axis=1)
+    m3 = np.mean(zero_mean**2 * zero_mean, axis=1)
+    m2_pow = np.array([m**1.5 for m in m2.tolist()])
+
+    # constant waves have no skewness
+    zero = m2 <= (np.finfo(m2.dtype).resolution * mean) ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(zero, np.nan, m3 / m2_pow)
@@ -0,0 +1,218 @@
+import json
+import platform
+import random
+import statistics
+
+import numpy as np
+from django.core.management import BaseCommand
+from django.utils import timezone
+from gensim.models import Word2Vec
+
+from analysis.utils.analyzer import ECGAnalyzer
+from analysis.utils.functions import extract_heartbeats_and_waves
+from common.utils.profiling import measure
+from common.utils.synthetic import generate_ecg_signal
+from modelling.data_preparation.manager import MITDBDatasetManager
+from modelling.data_preparation.utils import (
+    _compute_features,
+    concatenate_letters,
+    convert_labels_to_letters,
+    extract_wave_features,
+)
+
+STAGES = (
+    "extract_heartbeats_and_waves",
+    "extract_wave_features",
+    "compute_features",
+    "balance_heartbeats_and_waves",
+    "generate_vectors",
+)
+
+# share of synthetic heartbeat annotations, 'N' has to outnumber 'L' for balancing
+ANNOTATION_WEIGHTS = {"N": 0.6, "L": 0.15, "R": 0.1, "V": 0.1, "A": 0.04, "F": 0.01}
+
+
+class InMemoryTrainingSession:
+    def __init__(self, word2vec):
+        self._word2vec = word2vec
+
+    def get_word2vec_model(self):
+        return self._word2vec
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the signal processing and feature hot paths on synthetic ECG "
+        "signals and save time and peak memory per stage as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--duration",
+            type=int,
+            default=1800,
+            help="Duration of the synthetic signal in seconds.",
+        )
+        parser.add_argument(
+            "--beats",
+            type=int,
+            default=None,
+            help="Number of heartbeats in the signal, 75 bpm by default.",
+        )
+        parser.add_argument("--fs", type=int, default=360)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--alphabet-size", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+        parser.add_argument(
+            "--output", default=None, help="Path of the JSON file with the results."
+        )
+        parser.add_argument(
+            "--compare",
+            default=None,
+            help="Path of a previous JSON result to compare the run against.",
+        )
+
+    def handle(self, *args, **kwargs):
+        random.seed(kwargs["seed"])
+        rng = np.random.default_rng(kwargs["seed"])
+
+        heart_rate = (
+            kwargs["beats"] * 60 / kwargs["duration"] if kwargs["beats"] else 75
+        )
+        ecg_signal, _ = generate_ecg_signal(
+            kwargs["duration"],
+            fs=kwargs["fs"],
+            heart_rate=heart_rate,
+            seed=kwargs["seed"],
+        )
+
+        # inputs of every stage are prepared up front, outside of the measurements
+        (
+            heartbeats,
+            _,
+            p_waves,
+            qrs_complexes,
+            t_waves,
+        ) = extract_heartbeats_and_waves(ecg_signal, fs=kwargs["fs"])
+        heartbeat_annotations = rng.choice(
+            list(ANNOTATION_WEIGHTS),
+            size=len(heartbeats),
+            p=list(ANNOTATION_WEIGHTS.values()),
+        ).tolist()
+
+        labels = rng.integers(0, kwargs["alphabet_size"], size=(3, len(heartbeats)))
+        words = concatenate_letters(
+            *(convert_labels_to_letters(wave_labels) for wave_labels in labels)
+        )
+        word2vec = Word2Vec(
+            [list(word) for word in words], vector_size=50, window=3, min_count=1
+        )
+        analyzer = ECGAnalyzer(
+            None, InMemoryTrainingSession(word2vec), use_label_table=False
+        )
+
+        stages = {
+            "extract_heartbeats_and_waves": lambda: extract_heartbeats_and_waves(
+                ecg_signal, fs=kwargs["fs"]
+            ),
+            "extract_wave_features": lambda: extract_wave_features(
+                p_waves, qrs_complexes, t_waves
+            ),
+            "compute_features": lambda: [
+                _compute_features(wave)
+                for waves in (p_waves, qrs_complexes, t_waves)
+                for wave in waves
+            ],
+            "balance_heartbeats_and_waves": lambda: MITDBDatasetManager.balance_heartbeats_and_waves(
+                heartbeats, heartbeat_annotations, p_waves, qrs_complexes, t_waves
+            ),
+            "generate_vectors": lambda: analyzer._generate_vectors(labels.T),
+        }
+
+        results = {
+            "created_at": timezone.now().isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+            },
+            "params": {
+                "duration": kwargs["duration"],
+                "fs": kwargs["fs"],
+                "beats": len(heartbeats),
+                "repeat": kwargs["repeat"],
+                "alphabet_size": kwargs["alphabet_size"],
+                "seed": kwargs["seed"],
+            },
+            "stages": {},
+        }
+
+        self.stdout.write(
+            f"{len(ecg_signal)} samples, {len(heartbeats)} heartbeats, "
+            f"{kwargs['repeat']} runs per stage"
+        )
+
+        for name in kwargs["stages"]:
+            results["stages"][name] = self._run_stage(stages[name], kwargs["repeat"])
+            self._write_stage(name, results["stages"][name])
+
+        if kwargs["output"]:
+            with open(kwargs["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results saved to {kwargs['output']}")
+
+        if kwargs["compare"]:
+            self._compare(results, kwargs["compare"])
+
+    @staticmethod
+    def _run_stage(func, repeat):
+        wall_times, cpu_times = [], []
+
+        for _ in range(repeat):
+            with measure() as stats:
+                func()
+
+            wall_times.append(stats["wall_time"])
+            cpu_times.append(stats["cpu_time"])
+
+        # tracing allocations slows the code down, so memory has a run of its own
+        with measure(trace_memory=True) as stats:
+            func()
+
+        return {
+            "wall_time": {
+                "min": min(wall_times),
+                "median": statistics.median(wall_times),
+                "mean": statistics.mean(wall_times),
+            },
+            "cpu_time": {"median": statistics.median(cpu_times)},
+            "peak_memory": stats["peak_memory"],
+        }
+
+    def _write_stage(self, name, stats):
+        self.stdout.write(
+            f"{name:<30} median {stats['wall_time']['median'] * 1000:10.2f} ms"
+            f"  min {stats['wall_time']['min'] * 1000:10.2f} ms"
+            f"  peak memory {stats['peak_memory'] / 2**20:8.2f} MiB"
+        )
+
+    def _compare(self, results, path):
+        with open(path) as f:
+            baseline = json.load(f)
+
+        self.stdout.write(f"Compared to {path}:")
+        for name, stats in results["stages"].items():
+            if name not in baseline["stages"]:
+                continue
+
+            previous = baseline["stages"][name]
+            time_ratio = stats["wall_time"]["median"] / previous["wall_time"]["median"]
+            memory_ratio = stats["peak_memory"] / max(previous["peak_memory"], 1)
+
+            style = self.style.ERROR if time_ratio > 1.1 else self.style.SUCCESS
+            self.stdout.write(
+                style(
+                    f"{name:<30} time x{time_ratio:.2f}  peak memory x{memory_ratio:.2f}"
+                )
+            )
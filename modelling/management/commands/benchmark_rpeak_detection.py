@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+from django.core.management import BaseCommand, CommandError
+
+from common.utils.synthetic import generate_ecg_signal
+from modelling.constants.enums import RPeakDetectionMode
+from modelling.data_preparation.manager import MITDBDatasetManager
+from modelling.data_preparation.utils import detect_rpeaks
+
+
+class Command(BaseCommand):
+    help = "Compare full and light R-peak detection on a 30-minute ECG record."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--duration",
+            type=int,
+            default=1800,
+            help="Duration of the synthetic record in seconds.",
+        )
+        parser.add_argument("--fs", type=int, default=360)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--record",
+            default=None,
+            help="MIT-BIH record name to use instead of a synthetic signal.",
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs["record"]:
+            record, _ = MITDBDatasetManager._read_record(kwargs["record"])
+            ecg_signal, fs = record[0][:, 0], record[1]["fs"]
+        else:
+            ecg_signal, _ = generate_ecg_signal(
+                kwargs["duration"], fs=kwargs["fs"], seed=0
+            )
+            fs = kwargs["fs"]
+
+        self.stdout.write(
+            f"Signal: {len(ecg_signal)} samples, {len(ecg_signal) / fs / 60:.1f} min at {fs} Hz"
+        )
+
+        timings, rpeaks = {}, {}
+        for mode in RPeakDetectionMode:
+            durations = []
+            for _ in range(kwargs["repeat"]):
+                start = time.perf_counter()
+                rpeaks[mode] = detect_rpeaks(ecg_signal, fs, mode=mode)
+                durations.append(time.perf_counter() - start)
+
+            timings[mode] = np.median(durations)
+            self.stdout.write(
+                f"{mode.value:>5}: median {timings[mode] * 1000:.1f} ms "
+                f"over {kwargs['repeat']} runs, {len(rpeaks[mode])} R-peaks"
+            )
+
+        if not np.array_equal(
+            rpeaks[RPeakDetectionMode.FULL], rpeaks[RPeakDetectionMode.LIGHT]
+        ):
+            raise CommandError("Light detection returned different R-peaks.")
+
+        saved = timings[RPeakDetectionMode.FULL] - timings[RPeakDetectionMode.LIGHT]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Light mode saves {saved * 1000:.1f} ms per record "
+                f"({saved / timings[RPeakDetectionMode.FULL]:.0%})."
+            )
+        )
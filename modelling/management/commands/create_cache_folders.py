@@ -3,7 +3,8 @@ import os
 from django.core.management import BaseCommand
 
 from modelling.constants import DATA_PREPARATION_CACHE_DIR, MITDB_DATASET_DIR, MITDB_FEATURES_DIR, MODELS_CACHE_DIR, \
-    SCALER_MODELS_CACHE_DIR, KMEANS_MODELS_CACHE_DIR, WORD2VEC_MODELS_CACHE_DIR, CLASSIFIER_MODELS_CACHE_DIR
+    MITDB_RECORDS_CACHE_DIR, MITDB_RPEAKS_CACHE_DIR, SCALER_MODELS_CACHE_DIR, KMEANS_MODELS_CACHE_DIR, WORD2VEC_MODELS_CACHE_DIR, CLASSIFIER_MODELS_CACHE_DIR, \
+    LABEL_TABLE_MODELS_CACHE_DIR, ALPHABETS_CACHE_DIR
 
 
 class Command(BaseCommand):
@@ -17,6 +18,12 @@ class Command(BaseCommand):
         if not os.path.isdir(MITDB_FEATURES_DIR):
             os.makedirs(MITDB_FEATURES_DIR)
 
+        if not os.path.isdir(MITDB_RECORDS_CACHE_DIR):
+            os.makedirs(MITDB_RECORDS_CACHE_DIR)
+
+        if not os.path.isdir(MITDB_RPEAKS_CACHE_DIR):
+            os.makedirs(MITDB_RPEAKS_CACHE_DIR)
+
         if not os.path.isdir(MODELS_CACHE_DIR):
             os.mkdir(MODELS_CACHE_DIR)
 
@@ -32,3 +39,8 @@ class Command(BaseCommand):
         if not os.path.isdir(CLASSIFIER_MODELS_CACHE_DIR):
             os.mkdir(CLASSIFIER_MODELS_CACHE_DIR)
 
+        if not os.path.isdir(LABEL_TABLE_MODELS_CACHE_DIR):
+            os.mkdir(LABEL_TABLE_MODELS_CACHE_DIR)
+
+        if not os.path.isdir(ALPHABETS_CACHE_DIR):
+            os.mkdir(ALPHABETS_CACHE_DIR)
@@ -0,0 +1,77 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from modelling.models import TrainingSession
+from modelling.serializers import TrainingSessionGeneralParamsSerializer
+from modelling.training.charts import TrainingChartsManager
+from modelling.training.manager import TrainingManager
+from modelling.views import TrainingSessionCreateView
+
+
+class Command(BaseCommand):
+    help = "Train a session synchronously on the cached MIT-BIH features."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alphabet-size", type=int, default=20)
+        parser.add_argument("--algorithm", default="knn")
+        parser.add_argument("--clustering-algorithm", default="kmeans")
+        parser.add_argument("--clustering-batch-size", type=int, default=1024)
+        parser.add_argument("--no-reuse-alphabet", action="store_true")
+        parser.add_argument("--skip-charts", action="store_true")
+        parser.add_argument("--cv-folds", type=int, default=None)
+        parser.add_argument(
+            "--param-grid",
+            default=None,
+            help="JSON object with lists of classifier parameters to sweep.",
+        )
+        parser.add_argument(
+            "--algorithm-params",
+            default="{}",
+            help="JSON object with the classifier parameters.",
+        )
+
+    def handle(self, *args, **kwargs):
+        general_params_serializer = TrainingSessionGeneralParamsSerializer(
+            data={
+                "alphabet_size": kwargs["alphabet_size"],
+                "algorithm": kwargs["algorithm"],
+                "clustering_algorithm": kwargs["clustering_algorithm"],
+                "clustering_batch_size": kwargs["clustering_batch_size"],
+                "reuse_alphabet": not kwargs["no_reuse_alphabet"],
+                "cv_folds": kwargs["cv_folds"],
+            }
+        )
+        if not general_params_serializer.is_valid():
+            raise CommandError(general_params_serializer.errors)
+        general_params = general_params_serializer.validated_data
+
+        algorithm_params_serializer = TrainingSessionCreateView.ALGORITHM_SERIALIZER[
+            general_params["algorithm"]
+        ](data=json.loads(kwargs["algorithm_params"]))
+        if not algorithm_params_serializer.is_valid():
+            raise CommandError(algorithm_params_serializer.errors)
+
+        try:
+            sweep_candidates = TrainingSessionCreateView.get_sweep_candidates(
+                general_params["algorithm"],
+                json.loads(kwargs["param_grid"]) if kwargs["param_grid"] else None,
+            )
+        except ValidationError as e:
+            raise CommandError(e.detail)
+
+        training_session = TrainingSession.objects.create()
+
+        manager = TrainingManager(
+            training_session,
+            general_params,
+            algorithm_params_serializer.validated_data,
+            sweep_candidates,
+        )
+        manager.run()
+
+        if not kwargs["skip_charts"]:
+            TrainingChartsManager(training_session).run()
+
+        self.stdout.write(str(training_session.id))
@@ -16,6 +16,21 @@ from modelling.data_preparation.manager import MITDBDatasetManager
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of processes used to extract heartbeats from the records.",
+        )
+        parser.add_argument(
+            "--full-length",
+            action="store_true",
+            help="Read the records in full instead of up to MITDB_SAMPTO samples.",
+        )
+
     def handle(self, *args, **kwargs):
-        manager = MITDBDatasetManager()
+        manager = MITDBDatasetManager(
+            n_jobs=kwargs["workers"], full_length=kwargs["full_length"]
+        )
         manager.cache_features()
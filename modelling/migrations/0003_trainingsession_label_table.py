@@ -0,0 +1,24 @@
+# Generated by Django 4.2.1 on 2026-10-18 08:36
+
+import django.core.files.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("modelling", "0002_alter_trainingsession_classifier_model_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trainingsession",
+            name="label_table",
+            field=models.FileField(
+                null=True,
+                storage=django.core.files.storage.FileSystemStorage(
+                    location="/Users/eugenereyek/PycharmProjects/EcgAnalysis/modelling/models_cache"
+                ),
+                upload_to="label_table/",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.1 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("modelling", "0003_trainingsession_label_table"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trainingsession",
+            name="silhouette_method",
+            field=models.CharField(
+                blank=True,
+                choices=[("exact", "Exact"), ("sampled", "Sampled")],
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="trainingsession",
+            name="silhouette_sample_size",
+            field=models.IntegerField(null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("modelling", "0004_trainingsession_silhouette_method"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trainingsession",
+            name="sweep_results",
+            field=models.JSONField(default=list),
+        ),
+    ]
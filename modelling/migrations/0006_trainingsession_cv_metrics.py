@@ -0,0 +1,22 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("modelling", "0005_trainingsession_sweep_results"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trainingsession",
+            name="cv_folds",
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="trainingsession",
+            name="cv_metrics",
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("modelling", "0006_trainingsession_cv_metrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trainingsession",
+            name="stage_metrics",
+            field=models.JSONField(default=list),
+        ),
+    ]
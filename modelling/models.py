@@ -1,11 +1,17 @@
 import uuid
 
-import joblib
 from django.core.files.storage import FileSystemStorage
 from django.db import models
 
-from modelling.constants import CLASSIFIER, KMEANS, MODELS_CACHE_DIR, WORD2VEC
-from modelling.constants.enums import TrainingSessionStatus
+from modelling.constants import (
+    CLASSIFIER,
+    KMEANS,
+    LABEL_TABLE,
+    MODELS_CACHE_DIR,
+    WORD2VEC,
+)
+from modelling.constants.enums import SilhouetteMethod, TrainingSessionStatus
+from modelling.utils.model_cache import model_cache
 
 MODELS_STORAGE = FileSystemStorage(location=MODELS_CACHE_DIR)
 
@@ -36,6 +42,10 @@ class TrainingSession(models.Model):
         storage=MODELS_STORAGE, upload_to=f"{CLASSIFIER}/", null=True
     )
     classifier_name = models.CharField(max_length=100, blank=True)
+    # Classifier labels of every possible word, see TrainingManager._compile_label_table
+    label_table = models.FileField(
+        storage=MODELS_STORAGE, upload_to=f"{LABEL_TABLE}/", null=True
+    )
 
     # Metrics
     train_accuracy = models.FloatField(null=True)
@@ -44,6 +54,22 @@ class TrainingSession(models.Model):
     recall = models.FloatField(null=True)
     f1_score = models.FloatField(null=True)
     silhouette_score = models.FloatField(null=True)
+    silhouette_method = models.CharField(
+        max_length=20, choices=SilhouetteMethod.choices(), blank=True
+    )
+    # heartbeats per wave type the silhouette was computed on, approximate for the
+    # stratified samples
+    silhouette_sample_size = models.IntegerField(null=True)
+
+    # Wall time, CPU time and peak RSS of every training stage, in order
+    stage_metrics = models.JSONField(default=list)
+
+    # Mean and standard deviation of the k-fold metrics
+    cv_folds = models.IntegerField(null=True)
+    cv_metrics = models.JSONField(default=dict)
+
+    # Validation metrics of every candidate of a hyperparameter sweep
+    sweep_results = models.JSONField(default=list)
 
     # Charts
     charts = models.JSONField(default=dict)
@@ -56,13 +82,24 @@ class TrainingSession(models.Model):
 
     def get_kmeans_models(self):
         return (
-            joblib.load(self.kmeans_p_model),
-            joblib.load(self.kmeans_qrs_model),
-            joblib.load(self.kmeans_t_model),
+            self._load_model("kmeans_p_model"),
+            self._load_model("kmeans_qrs_model"),
+            self._load_model("kmeans_t_model"),
         )
 
     def get_word2vec_model(self):
-        return joblib.load(self.word2vec_model)
+        return self._load_model("word2vec_model")
 
     def get_classifier_model(self):
-        return joblib.load(self.classifier_model)
+        return self._load_model("classifier_model")
+
+    def get_label_table(self):
+        if not self.label_table:
+            return None
+
+        return self._load_model("label_table")
+
+    def _load_model(self, field_name):
+        return model_cache.load(
+            (str(self.id), field_name), getattr(self, field_name).path
+        )
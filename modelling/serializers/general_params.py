@@ -1,6 +1,10 @@
 from rest_framework import serializers
 
-from modelling.constants.enums import ClassificationAlgorithm
+from modelling.constants.enums import (
+    ClassificationAlgorithm,
+    ClusteringAlgorithm,
+    SilhouetteMethod,
+)
 
 
 class TrainingSessionGeneralParamsSerializer(serializers.Serializer):
@@ -10,6 +14,32 @@ class TrainingSessionGeneralParamsSerializer(serializers.Serializer):
         choices=ClassificationAlgorithm.choices(),
         error_messages={"invalid_choice": "Invalid choice."},
     )
+    clustering_algorithm = serializers.ChoiceField(
+        required=False,
+        default=ClusteringAlgorithm.KMEANS,
+        choices=ClusteringAlgorithm.choices(),
+        error_messages={"invalid_choice": "Invalid choice."},
+    )
+    # used by minibatch_kmeans only
+    clustering_batch_size = serializers.IntegerField(
+        required=False, default=1024, min_value=1
+    )
+    # reuse the clustering and word2vec models of an earlier session when possible
+    reuse_alphabet = serializers.BooleanField(required=False, default=True)
+    silhouette_method = serializers.ChoiceField(
+        required=False,
+        default=SilhouetteMethod.SAMPLED,
+        choices=SilhouetteMethod.choices(),
+        error_messages={"invalid_choice": "Invalid choice."},
+    )
+    # used by the sampled silhouette method only
+    silhouette_sample_size = serializers.IntegerField(
+        required=False, default=10000, min_value=2
+    )
+    # stratified k-fold evaluation in addition to the test split, off by default
+    cv_folds = serializers.IntegerField(
+        required=False, default=None, allow_null=True, min_value=2, max_value=20
+    )
 
     def create(self, validated_data):
         pass
@@ -1,9 +1,14 @@
+import json
+
 from rest_framework import serializers
 
 from modelling.models import TrainingSession
 
 
 class TrainingSessionSerializer(serializers.ModelSerializer):
+    charts_ready = serializers.SerializerMethodField()
+    charts_failed = serializers.SerializerMethodField()
+
     class Meta:
         model = TrainingSession
         fields = (
@@ -14,9 +19,31 @@ class TrainingSessionSerializer(serializers.ModelSerializer):
             "recall",
             "f1_score",
             "silhouette_score",
+            "silhouette_method",
+            "silhouette_sample_size",
+            "cv_folds",
+            "cv_metrics",
+            "sweep_results",
+            "stage_metrics",
             "charts",
+            "charts_ready",
+            "charts_failed",
         )
 
+    def get_charts_ready(self, instance):
+        # t-SNE charts are generated after the session is done
+        return "tsne" in self._get_charts(instance)
+
+    def get_charts_failed(self, instance):
+        return "tsne_error" in self._get_charts(instance)
+
+    @staticmethod
+    def _get_charts(instance):
+        charts = instance.charts
+        if isinstance(charts, str):
+            charts = json.loads(charts)
+        return charts
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         for field in [
@@ -29,4 +56,8 @@ class TrainingSessionSerializer(serializers.ModelSerializer):
         ]:
             if representation[field] is not None:
                 representation[field] = "{:.1f}%".format(representation[field] * 100)
+        representation["cv_metrics"] = {
+            metric: {key: "{:.1f}%".format(value * 100) for key, value in stats.items()}
+            for metric, stats in representation["cv_metrics"].items()
+        }
         return representation
@@ -2,17 +2,40 @@ from celery import shared_task
 from celery.utils.log import get_task_logger
 
 from modelling.models import TrainingSession
+from modelling.training.charts import TrainingChartsManager
 from modelling.training.manager import TrainingManager
 
 
 logger = get_task_logger(__name__)
 
 @shared_task
-def q_train_model(training_session_id, general_params, algorithm_params):
+def q_train_model(
+    training_session_id, general_params, algorithm_params, sweep_candidates=None
+):
     session = TrainingSession.objects.filter(id=training_session_id).first()
     if not session:
         logger.warning(f'Training session with id {training_session_id} does not exist. Existing task...')
         return
 
-    manager = TrainingManager(session, general_params, algorithm_params)
+    manager = TrainingManager(
+        session, general_params, algorithm_params, sweep_candidates
+    )
     manager.run()
+
+    # the session is usable already, the charts follow in a task of their own
+    q_generate_training_charts.delay(training_session_id)
+
+
+@shared_task
+def q_generate_training_charts(training_session_id):
+    session = TrainingSession.objects.filter(id=training_session_id).first()
+    if not session:
+        logger.warning(f'Training session with id {training_session_id} does not exist. Existing task...')
+        return
+
+    manager = TrainingChartsManager(session)
+    try:
+        manager.run()
+    except Exception as e:
+        logger.exception(f"Charts of training session {training_session_id} failed")
+        manager.fail(f"{e.__class__.__name__}: {e}")
@@ -0,0 +1,679 @@
+import os
+import tempfile
+import warnings
+from contextlib import contextmanager
+from unittest import mock
+
+import joblib
+import numpy as np
+import wfdb
+from django.test import SimpleTestCase, override_settings
+from gensim.models import Word2Vec
+from sklearn.neighbors import KNeighborsClassifier
+
+from common.utils.synthetic import generate_ecg_signal
+from modelling.constants.enums import SilhouetteMethod
+from modelling.data_preparation import manager as data_preparation_manager
+from modelling.data_preparation.manager import MITDBDatasetManager
+from modelling.data_preparation.utils import (
+    _compute_features,
+    _compute_features_batch,
+    compute_wave_features,
+    convert_labels_to_letters,
+    gather_word_vectors,
+    get_heartbeat_boundaries,
+    match_annotations,
+    word_ids_to_sentences,
+    word_ids_to_vectors,
+    word_ids_to_words,
+)
+from modelling.training import alphabet_cache
+from modelling.training.manager import TrainingManager
+from modelling.training.silhouette import compute_silhouette_score
+from modelling.utils.model_cache import ModelCache
+
+
+class HeartbeatBoundariesTests(SimpleTestCase):
+    def test_boundaries(self):
+        rpeaks = np.array([100, 400])
+        starts, ends, p_wave_ends, qrs_complex_ends = get_heartbeat_boundaries(
+            rpeaks, 300, 1000
+        )
+
+        np.testing.assert_array_equal(starts, [10, 310])
+        np.testing.assert_array_equal(ends, [250, 550])
+        np.testing.assert_array_equal(p_wave_ends, [58, 358])
+        np.testing.assert_array_equal(qrs_complex_ends, [154, 454])
+
+    def test_boundaries_are_clipped_to_the_signal(self):
+        rpeaks = np.array([50, 950])
+        starts, ends, _, _ = get_heartbeat_boundaries(rpeaks, 300, 1000)
+
+        np.testing.assert_array_equal(starts, [0, 860])
+        np.testing.assert_array_equal(ends, [200, 999])
+
+
+class MatchAnnotationsTests(SimpleTestCase):
+    def _match(self, rpeaks, samples, average_rr_interval=100):
+        rpeaks = np.array(rpeaks)
+        starts, ends, _, _ = get_heartbeat_boundaries(
+            rpeaks, average_rr_interval, 10000
+        )
+        return match_annotations(
+            rpeaks, starts, ends, average_rr_interval, np.array(samples, dtype=int)
+        )
+
+    def test_closest_annotation_in_range(self):
+        indices = self._match([100, 300, 500], [95, 210, 302, 498, 700])
+
+        np.testing.assert_array_equal(indices, [0, 2, 3])
+
+    def test_annotation_out_of_range(self):
+        # annotations farther than 0.2 of the rr interval are not matched
+        indices = self._match([100, 300, 500], [75, 325, 479])
+
+        np.testing.assert_array_equal(indices, [-1, -1, -1])
+
+    def test_range_bounds_are_inclusive(self):
+        indices = self._match([100, 300], [80, 320])
+
+        np.testing.assert_array_equal(indices, [0, 1])
+
+    def test_equal_distance_prefers_the_earlier_annotation(self):
+        indices = self._match([100], [95, 105])
+
+        np.testing.assert_array_equal(indices, [0])
+
+    def test_duplicate_samples_match_the_first_one(self):
+        indices = self._match([100], [90, 98, 98])
+
+        np.testing.assert_array_equal(indices, [1])
+
+    def test_rpeaks_before_and_after_every_annotation(self):
+        indices = self._match([10, 500, 990], [500])
+
+        np.testing.assert_array_equal(indices, [-1, 0, -1])
+
+    def test_no_annotations(self):
+        indices = self._match([100, 300], [])
+
+        np.testing.assert_array_equal(indices, [-1, -1])
+
+
+class WaveFeaturesTests(SimpleTestCase):
+    @staticmethod
+    def _waves():
+        rng = np.random.default_rng(0)
+        waves = [
+            rng.normal(size=length)
+            for length in rng.permutation(np.repeat(np.arange(1, 40), 3))
+        ]
+        # constant and silent waves, and cosines whose power peaks in two mirrored
+        # bins with exactly the same value, where argmax has to pick the first one
+        waves += [np.zeros(1), np.zeros(5), np.full(2, 0.5), np.full(7, -1.0)]
+        waves += [np.cos(2 * np.pi * 3 * np.arange(16) / 16) for _ in range(2)]
+        waves += [np.sin(2 * np.pi * 2 * np.arange(9) / 9) + 0.1]
+        return waves
+
+    @staticmethod
+    @contextmanager
+    def _ignore_warnings():
+        # constant and short waves have no skewness, silent ones no spectrum
+        with warnings.catch_warnings(), np.errstate(all="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            yield
+
+    def test_cosine_has_tied_power_peaks(self):
+        power = np.abs(np.fft.fft(np.cos(2 * np.pi * 3 * np.arange(16) / 16)))
+
+        self.assertEqual(power[3], power[13])
+        self.assertEqual(np.argmax(power), 3)
+
+    def test_batch_matches_per_wave_features(self):
+        for length in (1, 2, 3, 16, 40):
+            waves = np.random.default_rng(length).normal(size=(5, length))
+
+            with self._ignore_warnings():
+                expected = [_compute_features(wave) for wave in waves]
+                features = _compute_features_batch(waves)
+
+            np.testing.assert_array_equal(features, expected)
+
+    def test_mixed_lengths_match_per_wave_features(self):
+        waves = self._waves()
+
+        with self._ignore_warnings():
+            expected = np.array([_compute_features(wave) for wave in waves])
+            features = compute_wave_features(waves)
+
+        self.assertEqual(features.shape, expected.shape)
+        # compared column by column, so that a mismatch names its feature
+        for column in range(expected.shape[1]):
+            np.testing.assert_array_equal(
+                features[:, column], expected[:, column], err_msg=f"column {column}"
+            )
+
+    def test_no_waves(self):
+        self.assertEqual(compute_wave_features([]).shape, (0, 11))
+
+
+class WordVectorsTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.word_ids = rng.integers(0, 8, size=(300, 3))
+        self.word2vec = Word2Vec(
+            word_ids_to_sentences(self.word_ids),
+            vector_size=16,
+            window=3,
+            min_count=1,
+            seed=0,
+            workers=1,
+        )
+
+    def _word_to_vec(self, word):
+        # the vector of a word as it was computed one word at a time
+        return np.mean([self.word2vec.wv[letter] for letter in word], axis=0)
+
+    def test_vectors_match_per_word_vectors(self):
+        vectors = word_ids_to_vectors(self.word_ids, self.word2vec)
+
+        expected = [
+            self._word_to_vec(word) for word in word_ids_to_words(self.word_ids)
+        ]
+        self.assertEqual(vectors.dtype, np.float32)
+        np.testing.assert_array_equal(vectors, expected)
+
+    def test_vectors_of_a_subset_of_letters(self):
+        # only some of the letters occur, e.g. in the heartbeats of one analysis
+        word_ids = np.array([[7, 3, 7], [3, 3, 3], [5, 7, 3]])
+
+        vectors = word_ids_to_vectors(word_ids, self.word2vec)
+
+        expected = [self._word_to_vec(word) for word in word_ids_to_words(word_ids)]
+        np.testing.assert_array_equal(vectors, expected)
+
+    def test_gathered_vectors_match_per_word_vectors(self):
+        # the label table holds the vectors of every letter, in cluster id order
+        letter_vectors = self.word2vec.wv[convert_labels_to_letters(range(8))]
+
+        vectors = gather_word_vectors(self.word_ids, letter_vectors)
+
+        expected = [
+            self._word_to_vec(word) for word in word_ids_to_words(self.word_ids)
+        ]
+        np.testing.assert_array_equal(vectors, expected)
+
+
+class MITDBRecordsMixin:
+    # a stand-in MIT-BIH database of short synthetic two-channel records
+    record_names = ["100", "101", "102"]
+    record_duration = 60
+
+    def setUp(self):
+        super().setUp()
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+
+        paths = {
+            "MITDB_DATASET_DIR": os.path.join(cache_dir.name, "datasets"),
+            "MITDB_FEATURES_DIR": os.path.join(cache_dir.name, "features"),
+            "MITDB_RECORDS_CACHE_DIR": os.path.join(cache_dir.name, "records"),
+            "MITDB_RPEAKS_CACHE_DIR": os.path.join(cache_dir.name, "rpeaks"),
+        }
+        paths["MITDB_FEATURES_MANIFEST"] = os.path.join(
+            paths["MITDB_FEATURES_DIR"], "manifest.json"
+        )
+        for name, path in paths.items():
+            if name != "MITDB_FEATURES_MANIFEST":
+                os.makedirs(path)
+            self._patch(mock.patch.object(data_preparation_manager, name, path))
+        self._patch(
+            mock.patch.object(wfdb, "get_record_list", return_value=self.record_names)
+        )
+        # no progress bars or logs in the test output
+        self._patch(
+            mock.patch.object(
+                data_preparation_manager, "tqdm", lambda iterable, **kwargs: iterable
+            )
+        )
+        self._patch(
+            mock.patch.object(data_preparation_manager.logger, "disabled", True)
+        )
+        self.paths = paths
+
+        for i, record_name in enumerate(self.record_names):
+            self._write_record(record_name, seed=i)
+
+    def _patch(self, patcher):
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write_record(self, record_name, seed):
+        ecg_signal, rpeaks = generate_ecg_signal(self.record_duration, seed=seed)
+        rng = np.random.default_rng(seed)
+
+        wfdb.wrsamp(
+            record_name,
+            fs=360,
+            units=["mV", "mV"],
+            sig_name=["MLII", "V5"],
+            p_signal=np.column_stack((ecg_signal[::-1], ecg_signal)),
+            fmt=["16", "16"],
+            write_dir=self.paths["MITDB_DATASET_DIR"],
+        )
+        wfdb.wrann(
+            record_name,
+            "atr",
+            rpeaks,
+            symbol=rng.choice(["N", "V", "L"], size=len(rpeaks)).tolist(),
+            write_dir=self.paths["MITDB_DATASET_DIR"],
+        )
+
+    def _clear(self, name):
+        for filename in os.listdir(self.paths[name]):
+            os.remove(os.path.join(self.paths[name], filename))
+
+
+class RecordFeatureExtractionTests(MITDBRecordsMixin, SimpleTestCase):
+    def test_parallel_extraction_matches_serial_extraction(self):
+        serial_results = list(
+            MITDBDatasetManager(n_jobs=1)._iter_record_features(self.record_names)
+        )
+        # the workers detect the R-peaks again instead of reading the cached ones
+        self._clear("MITDB_RPEAKS_CACHE_DIR")
+        parallel_results = list(
+            MITDBDatasetManager(n_jobs=2)._iter_record_features(self.record_names)
+        )
+
+        self.assertEqual(len(parallel_results), len(self.record_names))
+        for serial_result, parallel_result in zip(serial_results, parallel_results):
+            self.assertEqual(list(parallel_result), list(serial_result))
+            for name, values in serial_result.items():
+                self.assertEqual(parallel_result[name].dtype, values.dtype)
+                np.testing.assert_array_equal(parallel_result[name], values)
+
+        # the records differ, so a different order would not go unnoticed
+        self.assertFalse(
+            np.array_equal(
+                serial_results[0]["heartbeat_intervals"],
+                serial_results[1]["heartbeat_intervals"],
+            )
+        )
+
+
+class RecordFeatureCacheTests(MITDBRecordsMixin, SimpleTestCase):
+    def _cache_record_features(self, **kwargs):
+        # returns the number of records whose features were extracted
+        extract = MITDBDatasetManager._extract_record_features
+        with mock.patch.object(
+            MITDBDatasetManager, "_extract_record_features", side_effect=extract
+        ) as extract_mock:
+            MITDBDatasetManager(n_jobs=1, **kwargs).cache_record_features()
+
+        return extract_mock.call_count
+
+    def _cached_files(self, name="MITDB_RECORDS_CACHE_DIR"):
+        return sorted(os.listdir(self.paths[name]))
+
+    def test_cached_records_are_not_extracted_again(self):
+        self.assertEqual(self._cache_record_features(), 3)
+        cached_files = self._cached_files()
+
+        self.assertEqual(self._cache_record_features(), 0)
+        self.assertEqual(self._cached_files(), cached_files)
+        self.assertEqual(len(cached_files), 3)
+
+    def test_records_are_extracted_again_when_the_extraction_changes(self):
+        changes = {
+            "version": mock.patch.object(
+                data_preparation_manager, "FEATURES_EXTRACTION_VERSION", 0
+            ),
+            "sampto": override_settings(MITDB_SAMPTO=10000),
+            "rpeak_detection_mode": override_settings(RPEAK_DETECTION_MODE="full"),
+            "channel": mock.patch.object(data_preparation_manager, "MITDB_CHANNEL", 0),
+        }
+        self._cache_record_features()
+
+        for name, change in changes.items():
+            with self.subTest(name), change:
+                cached_files = self._cached_files()
+
+                self.assertEqual(self._cache_record_features(), 3)
+                # the caches of the previous extraction are replaced
+                self.assertEqual(len(self._cached_files()), 3)
+                self.assertFalse(set(cached_files) & set(self._cached_files()))
+
+            # and are extracted again when the change is undone
+            self.assertEqual(self._cache_record_features(), 3)
+
+    def test_rpeaks_are_detected_again_when_the_detection_changes(self):
+        self._cache_record_features()
+        cached_files = self._cached_files("MITDB_RPEAKS_CACHE_DIR")
+
+        with override_settings(RPEAK_DETECTION_MODE="full"):
+            self._cache_record_features()
+
+        self.assertEqual(len(self._cached_files("MITDB_RPEAKS_CACHE_DIR")), 3)
+        self.assertFalse(
+            set(cached_files) & set(self._cached_files("MITDB_RPEAKS_CACHE_DIR"))
+        )
+
+    def test_unreadable_record_caches_are_rebuilt(self):
+        self._cache_record_features()
+        manager = MITDBDatasetManager(n_jobs=1)
+        expected = manager.load_record_features_from_cache()
+
+        # cut short, overwritten, and holding only some of the features
+        path = manager._get_record_cache_path("100")
+        with open(path, "rb") as f:
+            content = f.read()
+        with open(path, "wb") as f:
+            f.write(content[: len(content) // 2])
+        with open(manager._get_record_cache_path("101"), "wb") as f:
+            f.write(b"not a cache")
+        with open(manager._get_record_cache_path("102"), "wb") as f:
+            np.savez(f, p_wave=np.zeros((1, 11)))
+
+        self.assertEqual(self._cache_record_features(), 3)
+        for features, expected_features in zip(
+            manager.load_record_features_from_cache(), expected
+        ):
+            np.testing.assert_array_equal(features, expected_features)
+
+    def test_unreadable_rpeaks_cache_is_detected_again(self):
+        self._cache_record_features()
+        manager = MITDBDatasetManager(n_jobs=1)
+        expected = manager.load_record_features_from_cache()
+
+        for filename in self._cached_files("MITDB_RPEAKS_CACHE_DIR"):
+            path = os.path.join(self.paths["MITDB_RPEAKS_CACHE_DIR"], filename)
+            with open(path, "r+b") as f:
+                f.truncate(20)
+        self._clear("MITDB_RECORDS_CACHE_DIR")
+
+        self.assertEqual(self._cache_record_features(), 3)
+        for features, expected_features in zip(
+            manager.load_record_features_from_cache(), expected
+        ):
+            np.testing.assert_array_equal(features, expected_features)
+
+    def test_featureset_follows_the_extraction(self):
+        manager = MITDBDatasetManager(n_jobs=1)
+        self.assertFalse(manager._is_featureset_cached)
+
+        features = np.zeros((2, 11))
+        manager.cache_wave_features_and_annotations(
+            features,
+            features,
+            features,
+            np.array(["N", "V"]),
+            extraction_key=manager._extraction_key,
+        )
+
+        self.assertTrue(manager._is_featureset_cached)
+        with override_settings(MITDB_SAMPTO=10000):
+            self.assertFalse(manager._is_featureset_cached)
+        with mock.patch.object(
+            data_preparation_manager, "FEATURES_EXTRACTION_VERSION", 0
+        ):
+            self.assertFalse(manager._is_featureset_cached)
+        with mock.patch.object(data_preparation_manager, "FEATURES_STORE_VERSION", 0):
+            self.assertFalse(manager._is_featureset_cached)
+
+
+class KNNLabelTableTests(SimpleTestCase):
+    def _assert_matches_row_by_row(self, **params):
+        # Words are means of a few letter vectors, so many of them are equal or at
+        # equal distances, where a plain batched predict differs from row by row
+        rng = np.random.default_rng(0)
+        letter_vectors = rng.normal(size=(12, 16)).astype(np.float32)
+        x_train = letter_vectors[rng.integers(0, 12, size=(1000, 3))].mean(axis=1)
+        y_train = rng.choice(["N", "V", "L"], size=1000)
+        vectors = letter_vectors[rng.integers(0, 12, size=(1000, 3))].mean(axis=1)
+
+        manager = TrainingManager.__new__(TrainingManager)
+        manager.classifier = KNeighborsClassifier(**params).fit(x_train, y_train)
+
+        predicted_labels = manager._predict_knn_chunk(vectors)
+
+        expected_labels = [
+            manager.classifier.predict(vectors[i : i + 1])[0]
+            for i in range(len(vectors))
+        ]
+        self.assertEqual(predicted_labels.tolist(), expected_labels)
+
+    def test_uniform_weights(self):
+        self._assert_matches_row_by_row(n_neighbors=5)
+
+    def test_distance_weights(self):
+        self._assert_matches_row_by_row(n_neighbors=5, weights="distance")
+
+    def test_more_neighbors_than_samples(self):
+        self._assert_matches_row_by_row(n_neighbors=1000)
+
+
+class AlphabetCacheTests(SimpleTestCase):
+    params = {"alphabet_size": 8, "vector_size": 16, "window": 3}
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+
+        patcher = mock.patch.object(
+            alphabet_cache, "ALPHABETS_CACHE_DIR", self.cache_dir
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _models(name):
+        return {
+            field_name: {"model": name, "field": field_name}
+            for field_name in alphabet_cache.ALPHABET_MODEL_FILES
+        }
+
+    def test_key_does_not_depend_on_the_parameter_order(self):
+        key = alphabet_cache.get_alphabet_key("featureset", self.params)
+        reordered_params = dict(reversed(list(self.params.items())))
+
+        self.assertEqual(
+            key, alphabet_cache.get_alphabet_key("featureset", reordered_params)
+        )
+
+    def test_key_changes_with_the_alphabet(self):
+        key = alphabet_cache.get_alphabet_key("featureset", self.params)
+
+        self.assertNotEqual(
+            key, alphabet_cache.get_alphabet_key("other-featureset", self.params)
+        )
+        self.assertNotEqual(
+            key,
+            alphabet_cache.get_alphabet_key(
+                "featureset", {**self.params, "alphabet_size": 9}
+            ),
+        )
+        with mock.patch.object(alphabet_cache, "ALPHABET_CACHE_VERSION", 0):
+            self.assertNotEqual(
+                key, alphabet_cache.get_alphabet_key("featureset", self.params)
+            )
+
+    def test_load_missing_alphabet(self):
+        self.assertIsNone(alphabet_cache.load_alphabet("missing"))
+
+    def test_save_and_load(self):
+        word_ids = np.array([[0, 1, 2], [3, 4, 5]])
+
+        self.assertTrue(
+            alphabet_cache.save_alphabet("key", self._models("first"), word_ids)
+        )
+        models, loaded_word_ids = alphabet_cache.load_alphabet("key")
+
+        self.assertEqual(models, self._models("first"))
+        np.testing.assert_array_equal(loaded_word_ids, word_ids)
+        # nothing is left of the entry written aside
+        self.assertEqual(os.listdir(self.cache_dir), ["key"])
+
+    def test_saved_alphabet_is_not_replaced(self):
+        word_ids = np.array([[0, 1, 2]])
+        alphabet_cache.save_alphabet("key", self._models("first"), word_ids)
+
+        self.assertFalse(
+            alphabet_cache.save_alphabet("key", self._models("second"), word_ids)
+        )
+        models, _ = alphabet_cache.load_alphabet("key")
+        self.assertEqual(models, self._models("first"))
+
+    def test_alphabet_saved_meanwhile_is_not_replaced(self):
+        word_ids = np.array([[0, 1, 2]])
+        rename = os.rename
+
+        def save_meanwhile(src, dst):
+            # another session caches the same alphabet while this one is writing it
+            os.makedirs(dst)
+            np.save(os.path.join(dst, alphabet_cache.WORD_IDS_FILE), word_ids)
+            rename(src, dst)
+
+        with mock.patch.object(alphabet_cache.os, "rename", save_meanwhile):
+            saved = alphabet_cache.save_alphabet("key", self._models("first"), word_ids)
+
+        self.assertFalse(saved)
+        self.assertEqual(os.listdir(self.cache_dir), ["key"])
+        self.assertEqual(
+            os.listdir(os.path.join(self.cache_dir, "key")),
+            [alphabet_cache.WORD_IDS_FILE],
+        )
+
+
+class ModelCacheTests(SimpleTestCase):
+    def setUp(self):
+        models_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(models_dir.cleanup)
+        self.models_dir = models_dir.name
+
+    def _dump(self, name, model):
+        path = os.path.join(self.models_dir, f"{name}.pkl")
+        joblib.dump(model, path)
+        return path
+
+    def _assert_stats(self, cache, **stats):
+        cache_stats = cache.get_stats()
+        self.assertEqual({name: cache_stats[name] for name in stats}, stats)
+
+    def test_hits_and_misses(self):
+        cache = ModelCache()
+        path = self._dump("model", {"weights": [1, 2, 3]})
+
+        model = cache.load("model", path)
+
+        self.assertEqual(model, {"weights": [1, 2, 3]})
+        self.assertIs(cache.load("model", path), model)
+        self._assert_stats(cache, hits=1, misses=1, items=1)
+
+    def test_least_recently_used_item_is_evicted(self):
+        cache = ModelCache(max_items=2)
+        paths = {name: self._dump(name, name) for name in ("a", "b", "c")}
+
+        cache.load("a", paths["a"])
+        cache.load("b", paths["b"])
+        cache.load("a", paths["a"])
+        cache.load("c", paths["c"])
+
+        self._assert_stats(cache, hits=1, misses=3, evictions=1, items=2)
+        cache.load("a", paths["a"])
+        self._assert_stats(cache, hits=2, misses=3)
+        # b was the least recently used model
+        cache.load("b", paths["b"])
+        self._assert_stats(cache, hits=2, misses=4, evictions=2)
+
+    def test_models_over_the_byte_limit_are_evicted(self):
+        paths = {name: self._dump(name, name * 1000) for name in ("a", "b", "c")}
+        sizes = {name: os.path.getsize(path) for name, path in paths.items()}
+        cache = ModelCache(max_bytes=sizes["a"] + sizes["b"])
+
+        cache.load("a", paths["a"])
+        cache.load("b", paths["b"])
+        self._assert_stats(cache, evictions=0, bytes=sizes["a"] + sizes["b"])
+
+        cache.load("c", paths["c"])
+        self._assert_stats(cache, evictions=1, items=2, bytes=sizes["b"] + sizes["c"])
+        cache.load("b", paths["b"])
+        cache.load("a", paths["a"])
+        self._assert_stats(cache, hits=1, misses=4, evictions=2)
+
+    def test_model_over_the_byte_limit_is_kept_alone(self):
+        cache = ModelCache(max_bytes=1)
+        paths = {name: self._dump(name, name) for name in ("a", "b")}
+
+        cache.load("a", paths["a"])
+        cache.load("b", paths["b"])
+
+        self._assert_stats(cache, evictions=1, items=1)
+        cache.load("b", paths["b"])
+        self._assert_stats(cache, hits=1)
+
+    def test_replaced_file_is_reloaded(self):
+        cache = ModelCache()
+        path = self._dump("model", "first")
+        cache.load("model", path)
+
+        # written aside and renamed, as the training does, so the inode changes
+        os.replace(self._dump("new-model", "second"), path)
+
+        self.assertEqual(cache.load("model", path), "second")
+        self._assert_stats(cache, hits=0, misses=2, invalidations=1, items=1)
+
+    def test_file_rewritten_in_place_is_reloaded(self):
+        cache = ModelCache()
+        path = self._dump("model", "first")
+        stat = os.stat(path)
+        cache.load("model", path)
+
+        # same inode and size, only the modification time tells them apart
+        joblib.dump("other", path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(os.stat(path).st_ino, stat.st_ino)
+        self.assertEqual(os.stat(path).st_size, stat.st_size)
+
+        self.assertEqual(cache.load("model", path), "other")
+        self._assert_stats(cache, misses=2, invalidations=1)
+
+    def test_file_growing_in_place_is_reloaded(self):
+        cache = ModelCache()
+        path = self._dump("model", "first")
+        stat = os.stat(path)
+        cache.load("model", path)
+
+        joblib.dump("first" * 100, path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertEqual(cache.load("model", path), "first" * 100)
+        self._assert_stats(cache, misses=2, invalidations=1)
+
+
+class SilhouetteScoreTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.labels = np.repeat([0, 1, 2], [10, 10, 1])
+        self.features = rng.normal(size=(len(self.labels), 2)) + self.labels[:, None]
+
+    def test_sample_size_is_the_size_of_the_stratified_sample(self):
+        # the shares of the clusters are rounded and every cluster keeps a member
+        _, sample_size = compute_silhouette_score(
+            self.features, self.labels, SilhouetteMethod.SAMPLED, sample_size=6
+        )
+
+        self.assertEqual(sample_size, 7)
+
+    def test_small_feature_sets_are_not_sampled(self):
+        score, sample_size = compute_silhouette_score(
+            self.features, self.labels, SilhouetteMethod.SAMPLED, sample_size=100
+        )
+        exact_score, exact_sample_size = compute_silhouette_score(
+            self.features, self.labels, SilhouetteMethod.EXACT
+        )
+
+        self.assertEqual(sample_size, 21)
+        self.assertEqual(exact_sample_size, 21)
+        self.assertEqual(score, exact_score)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import joblib
+import numpy as np
+
+from modelling.constants import ALPHABETS, ALPHABETS_CACHE_DIR
+
+# Bump whenever the clustering or word2vec training changes
+ALPHABET_CACHE_VERSION = 1
+
+# session model field -> file of the cached alphabet
+ALPHABET_MODEL_FILES = {
+    "kmeans_p_model": "kmeans_p.pkl",
+    "kmeans_qrs_model": "kmeans_qrs.pkl",
+    "kmeans_t_model": "kmeans_t.pkl",
+    "word2vec_model": "word2vec.pkl",
+}
+WORD_IDS_FILE = "word_ids.npy"
+
+
+# Content-addressed cache of fitted alphabets (the three clustering models, word2vec
+# and the words of the feature set), shared by the training sessions that use the
+# same feature set and alphabet parameters. Sessions reference the cached files
+# instead of copies of them.
+def get_alphabet_key(featureset_key, params):
+    params = {"version": ALPHABET_CACHE_VERSION, "featureset": featureset_key, **params}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def get_alphabet_file_name(key, field_name):
+    # relative to the storage of the session models
+    return f"{ALPHABETS}/{key}/{ALPHABET_MODEL_FILES[field_name]}"
+
+
+def load_alphabet(key):
+    path = os.path.join(ALPHABETS_CACHE_DIR, key)
+    if not os.path.isdir(path):
+        return None
+
+    models = {
+        field_name: joblib.load(os.path.join(path, file_name))
+        for field_name, file_name in ALPHABET_MODEL_FILES.items()
+    }
+    word_ids = np.load(os.path.join(path, WORD_IDS_FILE))
+
+    return models, word_ids
+
+
+def save_alphabet(key, models, word_ids):
+    # returns whether the entry was written by this call, an entry cached meanwhile
+    # by another session holds different models
+    path = os.path.join(ALPHABETS_CACHE_DIR, key)
+    if os.path.isdir(path):
+        return False
+
+    # the entry is written aside and renamed, so it is never seen half written
+    tmp_path = os.path.join(ALPHABETS_CACHE_DIR, f".{key}.{uuid.uuid4().hex}")
+    os.makedirs(tmp_path)
+
+    for field_name, file_name in ALPHABET_MODEL_FILES.items():
+        joblib.dump(models[field_name], os.path.join(tmp_path, file_name))
+    np.save(os.path.join(tmp_path, WORD_IDS_FILE), word_ids)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # another session has cached the same alphabet meanwhile
+        shutil.rmtree(tmp_path)
+        return False
+
+    return True
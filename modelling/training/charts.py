@@ -0,0 +1,154 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from sklearn.manifold import TSNE
+
+from modelling.constants import ALPHABETS
+from modelling.data_preparation.manager import MITDBDatasetManager
+from modelling.data_preparation.utils import convert_labels_to_letters
+from modelling.training.stages import measure_stage
+
+TSNE_SAMPLE_SIZE = 500
+TSNE_CACHE_FILE = "tsne.json"
+
+
+# Generates the t-SNE charts of a trained session after it has been marked as done,
+# so that the session serves analyses while they are computed. Sessions sharing a
+# cached alphabet share its charts as well.
+class TrainingChartsManager:
+    def __init__(self, training_session):
+        self._session = training_session
+
+    def run(self):
+        with measure_stage(self._session, "tsne"):
+            tsne_plots = self._load_cached_tsne_plots()
+            if tsne_plots is None:
+                tsne_plots = self._get_tsne_plots()
+                self._cache_tsne_plots(tsne_plots)
+
+        self._update_charts("tsne", tsne_plots)
+
+    def fail(self, error):
+        # lets the clients waiting for the charts stop
+        self._update_charts("tsne_error", error)
+
+    def _update_charts(self, key, value):
+        charts = json.loads(self._session.charts) if self._session.charts else {}
+        # a run replaces the outcome of the previous one
+        charts.pop("tsne", None)
+        charts.pop("tsne_error", None)
+        charts[key] = value
+
+        self._session.charts = json.dumps(charts)
+        self._session.save(update_fields=["charts", "modified_at"])
+
+    def _get_tsne_plots(self):
+        (
+            p_wave_features,
+            qrs_complex_features,
+            t_wave_features,
+            _,
+        ) = MITDBDatasetManager.load_features_and_annotations_from_cache()
+        kmeans_p, kmeans_qrs, kmeans_t = self._session.get_kmeans_models()
+
+        # the samples are fixed, so that the cached charts match the sessions sharing them
+        rng = np.random.default_rng(42)
+        samples = [
+            self.__sample_features(features, kmeans, rng)
+            for features, kmeans in (
+                (p_wave_features, kmeans_p),
+                (qrs_complex_features, kmeans_qrs),
+                (t_wave_features, kmeans_t),
+            )
+        ]
+
+        # the three embeddings are fitted in parallel
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            p_tsne_fig, qrs_tsne_fig, t_tsne_fig = executor.map(
+                lambda sample: self.__tsne_plot(*sample), samples
+            )
+
+        return {
+            "p": p_tsne_fig.to_json(),
+            "qrs": qrs_tsne_fig.to_json(),
+            "t": t_tsne_fig.to_json(),
+        }
+
+    def _load_cached_tsne_plots(self):
+        path = self._get_tsne_cache_path()
+        if not path or not os.path.isfile(path):
+            return None
+
+        with open(path) as f:
+            return json.load(f)
+
+    def _cache_tsne_plots(self, tsne_plots):
+        path = self._get_tsne_cache_path()
+        if not path:
+            return
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(tsne_plots, f)
+        os.replace(tmp_path, path)
+
+    def _get_tsne_cache_path(self):
+        # only sessions referencing a cached alphabet have a place to share charts in
+        if not self._session.kmeans_p_model.name.startswith(f"{ALPHABETS}/"):
+            return None
+
+        return os.path.join(
+            os.path.dirname(self._session.kmeans_p_model.path), TSNE_CACHE_FILE
+        )
+
+    @staticmethod
+    def __sample_features(features, kmeans, rng):
+        if len(features) > TSNE_SAMPLE_SIZE:
+            indices = np.sort(
+                rng.choice(len(features), size=TSNE_SAMPLE_SIZE, replace=False)
+            )
+            features = features[indices]
+
+        features = np.asarray(features, dtype=kmeans.cluster_centers_.dtype)
+        return features, convert_labels_to_letters(kmeans.predict(features))
+
+    @staticmethod
+    def __tsne_plot(features, labels):
+        tsne = TSNE(n_components=2)
+        features_2d = tsne.fit_transform(features)
+
+        # Create dataframe for Plotly
+        df = pd.DataFrame(
+            data={
+                "x": features_2d[:, 0],
+                "y": features_2d[:, 1],
+                "Cluster": labels,
+            }
+        )
+
+        # Create a plotly express scatter plot
+        fig = px.scatter(df, x="x", y="y", color="Cluster")
+
+        # Remove axis labels
+        fig.update_xaxes(showticklabels=False)
+        fig.update_yaxes(showticklabels=False)
+
+        # Remove chart borders
+        fig.update_xaxes(showline=False, zeroline=False)
+        fig.update_yaxes(showline=False, zeroline=False)
+
+        # Remove title and axis titles
+        fig.update_layout(
+            showlegend=True,
+            autosize=True,
+            title=None,
+            xaxis_title=None,
+            yaxis_title=None,
+            margin=dict(l=0, r=0, t=0, b=0),  # This line reduces the chart borders
+        )
+
+        return fig
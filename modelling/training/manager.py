@@ -1,36 +1,68 @@
 import io
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union
 
 import joblib
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.figure_factory as ff
+from django.conf import settings
 from django.core.files.base import ContentFile
 from gensim.models import Word2Vec
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.manifold import TSNE
 from sklearn.metrics import (
     accuracy_score,
     confusion_matrix,
     f1_score,
     precision_score,
     recall_score,
-    silhouette_score,
 )
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.svm import SVC
-
-from modelling.constants.enums import ClassificationAlgorithm, TrainingSessionStatus
+from threadpoolctl import threadpool_limits
+
+from common.utils.profiling import measure
+from modelling.constants.enums import (
+    ClassificationAlgorithm,
+    ClusteringAlgorithm,
+    SilhouetteMethod,
+    TrainingSessionStatus,
+)
 from modelling.data_preparation.manager import MITDBDatasetManager
 from modelling.data_preparation.utils import (
-    concatenate_letters,
     convert_labels_to_letters,
-    word_to_vec,
+    word_ids_to_sentences,
+    word_ids_to_vectors,
+)
+from modelling.training.alphabet_cache import (
+    ALPHABET_MODEL_FILES,
+    get_alphabet_file_name,
+    get_alphabet_key,
+    load_alphabet,
+    save_alphabet,
 )
+from modelling.training.silhouette import compute_silhouette_score
+from modelling.training.stages import measure_stage
+
+LABEL_TABLE_CHUNK_SIZE = 65536
+
+# distances and votes this close are treated as ties when compiling knn label tables,
+# as are the distance weights of neighbours this close
+KNN_TIE_RTOL = 1e-5
+KNN_TIE_ATOL = 1e-6
+KNN_TIE_MIN_DISTANCE = 1e-3
+
+CV_SCORING = {
+    "accuracy": "accuracy",
+    "precision": "precision_weighted",
+    "recall": "recall_weighted",
+    "f1_score": "f1_weighted",
+}
+
+WORD2VEC_PARAMS = {"vector_size": 50, "window": 3, "min_count": 1}
 
 ALGORITHM_CLASS = {
     ClassificationAlgorithm.KNN: KNeighborsClassifier,
@@ -38,18 +70,24 @@ ALGORITHM_CLASS = {
     ClassificationAlgorithm.RANDOM_FOREST: RandomForestClassifier,
 }
 
+CLUSTERING_CLASS = {
+    ClusteringAlgorithm.KMEANS: KMeans,
+    ClusteringAlgorithm.MINIBATCH_KMEANS: MiniBatchKMeans,
+}
+
 
 class TrainingManager:
-    kmeans_p: KMeans
-    kmeans_qrs: KMeans
-    kmeans_t: KMeans
+    kmeans_p: Union[KMeans, MiniBatchKMeans]
+    kmeans_qrs: Union[KMeans, MiniBatchKMeans]
+    kmeans_t: Union[KMeans, MiniBatchKMeans]
     word2vec: Word2Vec
     classifier: Union[KNeighborsClassifier, SVC, RandomForestClassifier]
+    label_table: Union[dict, None]
 
-    X_train: list
-    X_test: list
-    y_train: list
-    y_test: list
+    X_train: np.ndarray
+    X_test: np.ndarray
+    y_train: np.ndarray
+    y_test: np.ndarray
 
     p_wave_features: np.ndarray
     qrs_complex_features: np.ndarray
@@ -59,19 +97,22 @@ class TrainingManager:
     labels_qrs: np.ndarray
     labels_t: np.ndarray
 
-    letters_p: np.ndarray
-    letters_qrs: np.ndarray
-    letters_t: np.ndarray
-
-    def __init__(self, training_session, general_params, algorithm_params):
+    def __init__(
+        self, training_session, general_params, algorithm_params, sweep_candidates=None
+    ):
         self._session = training_session
 
         self.__general_params = general_params
         self.__algorithm_params = algorithm_params
+        self.__sweep_candidates = sweep_candidates
+
+        self._alphabet_key = None
+        self._silhouette_method = None
 
     def run(self):
         self._session.status = TrainingSessionStatus.TRAINING
         self._session.classifier_name = self.__general_params["algorithm"]
+        self._session.stage_metrics = []
         self._session.save()
 
         self._train()
@@ -81,7 +122,8 @@ class TrainingManager:
 
         self._evaluate()
 
-        self._save()
+        with measure_stage(self._session, "save"):
+            self._save()
 
         self._session.status = TrainingSessionStatus.DONE
         self._session.save()
@@ -89,44 +131,63 @@ class TrainingManager:
     def _train(self):
         dataset_manager = MITDBDatasetManager()
 
-        (
-            self.p_wave_features,
-            self.qrs_complex_features,
-            self.t_wave_features,
-            heartbeat_annotations,
-        ) = dataset_manager.load_features_and_annotations_from_cache()
-
-        words = self._generate_words()
-
-        vectors = self._generate_vectors(words)
+        with measure_stage(self._session, "load_features"):
+            (
+                self.p_wave_features,
+                self.qrs_complex_features,
+                self.t_wave_features,
+                heartbeat_annotations,
+            ) = dataset_manager.load_features_and_annotations_from_cache()
+
+        with measure_stage(self._session, "load_alphabet"):
+            alphabet = self._load_alphabet(dataset_manager.get_featureset_key())
+        if alphabet is not None:
+            word_ids = alphabet
+            # the cached word2vec model is only looked up
+            with measure_stage(self._session, "vectors"):
+                vectors = word_ids_to_vectors(word_ids, self.word2vec)
+        else:
+            with measure_stage(self._session, "clustering"):
+                word_ids = self._generate_words()
+            with measure_stage(self._session, "word2vec"):
+                vectors = self._generate_vectors(word_ids)
+            with measure_stage(self._session, "save_alphabet"):
+                self._save_alphabet(word_ids)
 
         self._fit_classifier(vectors, heartbeat_annotations)
 
+        with measure_stage(self._session, "label_table"):
+            self._compile_label_table()
+
     def _evaluate(self):
-        # Predictions on training data
-        y_train_pred = self.classifier.predict(self.X_train)
+        with measure_stage(self._session, "evaluation"):
+            # Predictions on training data
+            y_train_pred = self.classifier.predict(self.X_train)
 
-        # Predictions on testing data
-        y_test_pred = self.classifier.predict(self.X_test)
+            # Predictions on testing data
+            y_test_pred = self.classifier.predict(self.X_test)
 
-        # Calculate metrics for training data
-        train_accuracy = accuracy_score(self.y_train, y_train_pred)
+            # Calculate metrics for training data
+            train_accuracy = accuracy_score(self.y_train, y_train_pred)
 
-        # Calculate metrics for testing data
-        test_accuracy = accuracy_score(self.y_test, y_test_pred)
-        precision = precision_score(self.y_test, y_test_pred, average="weighted")
-        recall = recall_score(self.y_test, y_test_pred, average="weighted")
-        f1 = f1_score(self.y_test, y_test_pred, average="weighted")
+            # Calculate metrics for testing data
+            test_accuracy = accuracy_score(self.y_test, y_test_pred)
+            precision = precision_score(self.y_test, y_test_pred, average="weighted")
+            recall = recall_score(self.y_test, y_test_pred, average="weighted")
+            f1 = f1_score(self.y_test, y_test_pred, average="weighted")
 
-        silhouette_p = silhouette_score(self.p_wave_features, self.labels_p)
-        silhouette_qrs = silhouette_score(self.qrs_complex_features, self.labels_qrs)
-        silhouette_t = silhouette_score(self.t_wave_features, self.labels_t)
-        silhouette_avg = (silhouette_p + silhouette_qrs + silhouette_t) / 3
+            # t-SNE charts are generated afterwards by TrainingChartsManager
+            charts = {
+                "confusion_matrix": self._get_confusion_matrix_plot(y_test_pred),
+            }
 
-        charts = {
-            "tsne": self._get_tsne_plots(),
-            "confusion_matrix": self._get_confusion_matrix_plot(y_test_pred),
-        }
+        with measure_stage(self._session, "silhouette"):
+            (
+                (silhouette_p, sample_size_p),
+                (silhouette_qrs, sample_size_qrs),
+                (silhouette_t, sample_size_t),
+            ) = self._get_silhouette_scores()
+        silhouette_avg = (silhouette_p + silhouette_qrs + silhouette_t) / 3
 
         self._session.train_accuracy = train_accuracy
         self._session.test_accuracy = test_accuracy
@@ -134,49 +195,145 @@ class TrainingManager:
         self._session.recall = recall
         self._session.f1_score = f1
         self._session.silhouette_score = silhouette_avg
+        self._session.silhouette_method = self._silhouette_method
+        # the wave types are sampled by their own clusters, so their sample sizes
+        # may differ by a few heartbeats
+        self._session.silhouette_sample_size = max(
+            sample_size_p, sample_size_qrs, sample_size_t
+        )
         self._session.charts = json.dumps(charts)
 
     def _save(self):
-        self.__save_model_to_field(
-            self.kmeans_p, self._session.kmeans_p_model, f"p_{self._session.id}"
-        )
-        self.__save_model_to_field(
-            self.kmeans_qrs, self._session.kmeans_qrs_model, f"qrs_{self._session.id}"
-        )
-        self.__save_model_to_field(
-            self.kmeans_t, self._session.kmeans_t_model, f"t_{self._session.id}"
-        )
-        self.__save_model_to_field(
-            self.word2vec, self._session.word2vec_model, f"{self._session.id}"
-        )
+        if self._alphabet_key:
+            # the session references the models of the cached alphabet
+            for field_name in ALPHABET_MODEL_FILES:
+                getattr(self._session, field_name).name = get_alphabet_file_name(
+                    self._alphabet_key, field_name
+                )
+        else:
+            self.__save_model_to_field(
+                self.kmeans_p, self._session.kmeans_p_model, f"p_{self._session.id}"
+            )
+            self.__save_model_to_field(
+                self.kmeans_qrs,
+                self._session.kmeans_qrs_model,
+                f"qrs_{self._session.id}",
+            )
+            self.__save_model_to_field(
+                self.kmeans_t, self._session.kmeans_t_model, f"t_{self._session.id}"
+            )
+            self.__save_model_to_field(
+                self.word2vec, self._session.word2vec_model, f"{self._session.id}"
+            )
         self.__save_model_to_field(
             self.classifier, self._session.classifier_model, f"{self._session.id}"
         )
+        if self.label_table is not None:
+            self.__save_model_to_field(
+                self.label_table, self._session.label_table, f"{self._session.id}"
+            )
 
     def _generate_words(self):
-        n_clusters = self.__general_params["alphabet_size"]
-
-        self.kmeans_p = KMeans(n_clusters=n_clusters)
-        self.kmeans_qrs = KMeans(n_clusters=n_clusters)
-        self.kmeans_t = KMeans(n_clusters=n_clusters)
-
-        self.labels_p = self.kmeans_p.fit_predict(self.p_wave_features)
-        self.labels_qrs = self.kmeans_qrs.fit_predict(self.qrs_complex_features)
-        self.labels_t = self.kmeans_t.fit_predict(self.t_wave_features)
+        self.kmeans_p = self._create_clustering_model()
+        self.kmeans_qrs = self._create_clustering_model()
+        self.kmeans_t = self._create_clustering_model()
+
+        # The three wave types are fitted concurrently (the fits release the GIL),
+        # sharing the thread budget so that BLAS and OpenMP do not oversubscribe
+        # the worker. The process-wide BLAS limit is set once around the pool. The
+        # OpenMP thread count belongs to the calling thread, so every pool thread
+        # sets its own when it starts and drops it when the pool shuts down
+        n_threads = max(1, settings.TRAINING_CLUSTERING_THREADS // 3)
+
+        def limit_openmp_threads():
+            threadpool_limits(limits=n_threads, user_api="openmp")
+
+        with threadpool_limits(limits=n_threads, user_api="blas"):
+            with ThreadPoolExecutor(
+                max_workers=3, initializer=limit_openmp_threads
+            ) as executor:
+                self.labels_p, self.labels_qrs, self.labels_t = executor.map(
+                    lambda model, features: model.fit_predict(features),
+                    (self.kmeans_p, self.kmeans_qrs, self.kmeans_t),
+                    (
+                        self.p_wave_features,
+                        self.qrs_complex_features,
+                        self.t_wave_features,
+                    ),
+                )
+
+        # every word is encoded as its p wave, qrs complex and t wave cluster ids
+        return np.column_stack((self.labels_p, self.labels_qrs, self.labels_t))
+
+    def _load_alphabet(self, featureset_key):
+        if not featureset_key or not self.__general_params.get("reuse_alphabet", True):
+            return None
+
+        self._alphabet_key = get_alphabet_key(
+            featureset_key, self._get_alphabet_params()
+        )
+        alphabet = load_alphabet(self._alphabet_key)
+        if alphabet is None:
+            return None
+
+        models, word_ids = alphabet
+        self.kmeans_p = models["kmeans_p_model"]
+        self.kmeans_qrs = models["kmeans_qrs_model"]
+        self.kmeans_t = models["kmeans_t_model"]
+        self.word2vec = models["word2vec_model"]
+        self.labels_p, self.labels_qrs, self.labels_t = word_ids.T
+
+        return word_ids
+
+    def _save_alphabet(self, word_ids):
+        if not self._alphabet_key:
+            return
+
+        models = {
+            "kmeans_p_model": self.kmeans_p,
+            "kmeans_qrs_model": self.kmeans_qrs,
+            "kmeans_t_model": self.kmeans_t,
+            "word2vec_model": self.word2vec,
+        }
+        if not save_alphabet(self._alphabet_key, models, word_ids):
+            # the cached entry was fitted by a concurrent session, its clusters and
+            # vectors do not match the classifier of this one, which keeps its own
+            self._alphabet_key = None
+
+    def _get_alphabet_params(self):
+        # everything the clustering models and word2vec depend on besides the features
+        clustering_algorithm = self.__general_params.get(
+            "clustering_algorithm", ClusteringAlgorithm.KMEANS
+        )
+        params = {
+            "alphabet_size": self.__general_params["alphabet_size"],
+            "clustering_algorithm": clustering_algorithm,
+            "word2vec": WORD2VEC_PARAMS,
+        }
+        if clustering_algorithm == ClusteringAlgorithm.MINIBATCH_KMEANS:
+            params["clustering_batch_size"] = self.__general_params.get(
+                "clustering_batch_size", 1024
+            )
 
-        self.letters_p = convert_labels_to_letters(self.labels_p)
-        self.letters_qrs = convert_labels_to_letters(self.labels_qrs)
-        self.letters_t = convert_labels_to_letters(self.labels_t)
+        return params
 
-        words = concatenate_letters(self.letters_p, self.letters_qrs, self.letters_t)
+    def _create_clustering_model(self):
+        clustering_algorithm = self.__general_params.get(
+            "clustering_algorithm", ClusteringAlgorithm.KMEANS
+        )
+        params = {"n_clusters": self.__general_params["alphabet_size"]}
+        if clustering_algorithm == ClusteringAlgorithm.MINIBATCH_KMEANS:
+            params["batch_size"] = self.__general_params.get(
+                "clustering_batch_size", 1024
+            )
 
-        return words
+        return CLUSTERING_CLASS[clustering_algorithm](**params)
 
-    def _generate_vectors(self, words):
-        sentences = [list(word) for word in words]
+    def _generate_vectors(self, word_ids):
+        sentences = word_ids_to_sentences(word_ids)
 
-        self.word2vec = Word2Vec(sentences, vector_size=50, window=3, min_count=1)
-        vectors = [word_to_vec(word, self.word2vec) for word in words]
+        self.word2vec = Word2Vec(sentences, **WORD2VEC_PARAMS)
+        vectors = word_ids_to_vectors(word_ids, self.word2vec)
 
         return vectors
 
@@ -185,37 +342,179 @@ class TrainingManager:
             vectors, heartbeat_annotations, test_size=0.2, random_state=42
         )
 
-        classifier_cls = ALGORITHM_CLASS[self.__general_params["algorithm"]]
-        classifier = classifier_cls(**self.__algorithm_params)
-        classifier.fit(self.X_train, self.y_train)
+        if self.__sweep_candidates:
+            with measure_stage(self._session, "sweep"):
+                self.__algorithm_params = self._run_sweep()
+
+        with measure_stage(self._session, "classifier_fit"):
+            classifier_cls = ALGORITHM_CLASS[self.__general_params["algorithm"]]
+            classifier = classifier_cls(**self.__algorithm_params)
+            classifier.fit(self.X_train, self.y_train)
 
         self.classifier = classifier
 
-    def _get_tsne_plots(
-        self,
-    ):
-        sample_size = 500
+        if self.__general_params.get("cv_folds"):
+            with measure_stage(self._session, "cross_validation"):
+                self._cross_validate(vectors, heartbeat_annotations)
 
-        p_wave_features_sample, letters_p_sample = self.__sample_features(
-            self.p_wave_features, self.letters_p, sample_size
+    def _cross_validate(self, vectors, heartbeat_annotations):
+        folds = self.__general_params["cv_folds"]
+        classifier_cls = ALGORITHM_CLASS[self.__general_params["algorithm"]]
+
+        # The folds are fitted in threads, so they index the same vectors instead
+        # of pickling a copy to every worker process
+        with threadpool_limits(limits=1, user_api="blas"):
+            with joblib.parallel_backend("threading"):
+                scores = cross_validate(
+                    classifier_cls(**self.__algorithm_params),
+                    vectors,
+                    heartbeat_annotations,
+                    cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=42),
+                    scoring=CV_SCORING,
+                    n_jobs=min(folds, settings.TRAINING_CV_JOBS),
+                )
+
+        self._session.cv_folds = folds
+        self._session.cv_metrics = {
+            metric: {
+                "mean": float(np.mean(scores[f"test_{metric}"])),
+                "std": float(np.std(scores[f"test_{metric}"])),
+            }
+            for metric in CV_SCORING
+        }
+
+    def _run_sweep(self):
+        # Candidates are scored on a validation part of the training data, the test
+        # data stays unseen until the best one is evaluated
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            self.X_train, self.y_train, test_size=0.2, random_state=42
+        )
+        classifier_cls = ALGORITHM_CLASS[self.__general_params["algorithm"]]
+
+        def evaluate(params):
+            with measure() as stats:
+                classifier = classifier_cls(**params).fit(X_fit, y_fit)
+            y_val_pred = classifier.predict(X_val)
+
+            return {
+                "params": params,
+                "accuracy": accuracy_score(y_val, y_val_pred),
+                "f1_score": f1_score(y_val, y_val_pred, average="weighted"),
+                "fit_time": stats["wall_time"],
+            }
+
+        # the fits run in threads (libsvm and the tree builders release the GIL),
+        # with BLAS limited to a thread each so that the workers stay bounded
+        with threadpool_limits(limits=1, user_api="blas"):
+            with ThreadPoolExecutor(
+                max_workers=settings.TRAINING_SWEEP_WORKERS
+            ) as executor:
+                results = list(executor.map(evaluate, self.__sweep_candidates))
+
+        # the first of equally scored candidates is promoted
+        best_result = max(results, key=lambda result: result["f1_score"])
+        for result in results:
+            result["best"] = result is best_result
+
+        self._session.sweep_results = results
+
+        return best_result["params"]
+
+    def _get_silhouette_scores(self):
+        method = self.__general_params.get(
+            "silhouette_method", SilhouetteMethod.SAMPLED
         )
-        qrs_complex_features_sample, letters_qrs_sample = self.__sample_features(
-            self.qrs_complex_features, self.letters_qrs, sample_size
+        sample_size = self.__general_params.get("silhouette_sample_size", 10000)
+
+        self._silhouette_method = method
+
+        def compute(features, labels):
+            return compute_silhouette_score(
+                features,
+                labels,
+                method,
+                sample_size=sample_size,
+                working_memory=settings.SILHOUETTE_WORKING_MEMORY,
+            )
+
+        # the wave types are evaluated in parallel, the distances release the GIL
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            return tuple(
+                executor.map(
+                    compute,
+                    (
+                        self.p_wave_features,
+                        self.qrs_complex_features,
+                        self.t_wave_features,
+                    ),
+                    (self.labels_p, self.labels_qrs, self.labels_t),
+                )
+            )
+
+    def _compile_label_table(self):
+        # A word is determined by its three cluster ids, so every possible word is
+        # classified once here and the analysis only looks its label up
+        alphabet_size = self.__general_params["alphabet_size"]
+        if alphabet_size**3 > settings.LABEL_TABLE_MAX_WORDS:
+            self.label_table = None
+            return
+
+        shape = (alphabet_size,) * 3
+        word_ids = np.indices(shape).reshape(3, -1).T
+        vectors = word_ids_to_vectors(word_ids, self.word2vec)
+
+        predict = (
+            self._predict_knn_chunk
+            if self.__general_params["algorithm"] == ClassificationAlgorithm.KNN
+            else self.classifier.predict
         )
-        t_wave_features_sample, letters_t_sample = self.__sample_features(
-            self.t_wave_features, self.letters_t, sample_size
+        predicted_labels = np.concatenate(
+            [
+                predict(vectors[i : i + LABEL_TABLE_CHUNK_SIZE])
+                for i in range(0, len(vectors), LABEL_TABLE_CHUNK_SIZE)
+            ]
         )
+        labels, label_ids = np.unique(predicted_labels, return_inverse=True)
+
+        self.label_table = {
+            "labels": labels,
+            "label_ids": label_ids.reshape(shape).astype(np.uint8),
+            "letter_vectors": self.word2vec.wv[
+                convert_labels_to_letters(range(alphabet_size))
+            ],
+        }
 
-        # Plot t-SNE for each wave sample
-        p_tsne_fig = self.__tsne_plot(p_wave_features_sample, letters_p_sample)
-        qrs_tsne_fig = self.__tsne_plot(qrs_complex_features_sample, letters_qrs_sample)
-        t_tsne_fig = self.__tsne_plot(t_wave_features_sample, letters_t_sample)
+    def _predict_knn_chunk(self, vectors):
+        # Batched knn distances differ in the last bits from the row by row ones of
+        # the analysis, which only matters for words close to a tie: a neighbour
+        # as close as the k-th one, or with distance weights, a neighbour at almost
+        # no distance or two classes with almost the same vote. These words are
+        # predicted row by row, the others in one batch
+        classifier = self.classifier
+        predicted_labels = classifier.predict(vectors)
 
-        return {
-            "p": p_tsne_fig.to_json(),
-            "qrs": qrs_tsne_fig.to_json(),
-            "t": t_tsne_fig.to_json(),
-        }
+        n_neighbors = min(classifier.n_neighbors + 1, classifier.n_samples_fit_)
+        distances, _ = classifier.kneighbors(vectors, n_neighbors=n_neighbors)
+
+        ambiguous = np.zeros(len(vectors), dtype=bool)
+        if n_neighbors > classifier.n_neighbors:
+            ambiguous |= np.isclose(
+                distances[:, -2], distances[:, -1], rtol=KNN_TIE_RTOL, atol=KNN_TIE_ATOL
+            )
+
+        if classifier.weights == "distance":
+            ambiguous |= distances[:, 0] < KNN_TIE_MIN_DISTANCE
+
+            if len(classifier.classes_) > 1:
+                votes = np.sort(classifier.predict_proba(vectors), axis=1)
+                ambiguous |= np.isclose(
+                    votes[:, -1], votes[:, -2], rtol=KNN_TIE_RTOL, atol=KNN_TIE_ATOL
+                )
+
+        for i in np.flatnonzero(ambiguous):
+            predicted_labels[i] = classifier.predict(vectors[i : i + 1])[0]
+
+        return predicted_labels
 
     def _get_confusion_matrix_plot(self, y_pred):
         # Compute confusion matrix
@@ -243,43 +542,6 @@ class TrainingManager:
 
         return fig.to_json()
 
-    @staticmethod
-    def __tsne_plot(features, labels):
-        tsne = TSNE(n_components=2)
-        features_2d = tsne.fit_transform(features)
-
-        # Create dataframe for Plotly
-        df = pd.DataFrame(
-            data={
-                "x": features_2d[:, 0],
-                "y": features_2d[:, 1],
-                "Cluster": labels,
-            }
-        )
-
-        # Create a plotly express scatter plot
-        fig = px.scatter(df, x="x", y="y", color="Cluster")
-
-        # Remove axis labels
-        fig.update_xaxes(showticklabels=False)
-        fig.update_yaxes(showticklabels=False)
-
-        # Remove chart borders
-        fig.update_xaxes(showline=False, zeroline=False)
-        fig.update_yaxes(showline=False, zeroline=False)
-
-        # Remove title and axis titles
-        fig.update_layout(
-            showlegend=True,
-            autosize=True,
-            title=None,
-            xaxis_title=None,
-            yaxis_title=None,
-            margin=dict(l=0, r=0, t=0, b=0),  # This line reduces the chart borders
-        )
-
-        return fig
-
     @staticmethod
     def __save_model_to_field(model, field, name):
         # Dump the model into a bytes buffer
@@ -289,12 +551,3 @@ class TrainingManager:
 
         # Save the buffer content to the field
         field.save(f"{name}.pkl", ContentFile(buffer.read()))
-
-    @staticmethod
-    def __sample_features(features, labels, size):
-        features = np.array(features)
-        labels = np.array(labels)
-        if len(features) > size:
-            indices = np.random.choice(len(features), size=size, replace=False)
-            return features[indices], labels[indices]
-        return features, labels
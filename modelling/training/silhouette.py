@@ -0,0 +1,41 @@
+import numpy as np
+from sklearn import config_context
+from sklearn.metrics import silhouette_score
+
+from modelling.constants.enums import SilhouetteMethod
+
+
+def compute_silhouette_score(
+    features, labels, method, sample_size=None, working_memory=None, random_state=42
+):
+    # returns the score and the number of heartbeats it was computed on
+    if method == SilhouetteMethod.SAMPLED and sample_size < len(labels):
+        indices = get_stratified_sample_indices(labels, sample_size, random_state)
+        features, labels = features[indices], labels[indices]
+
+    # silhouette_score computes the distances in chunks of at most working_memory MiB;
+    # the sklearn config is thread local, so it is set by the thread computing it
+    with config_context(working_memory=working_memory):
+        return silhouette_score(features, labels), len(labels)
+
+
+def get_stratified_sample_indices(labels, sample_size, random_state=42):
+    # every cluster keeps its share of the sample, and at least one member
+    rng = np.random.default_rng(random_state)
+    clusters, inverse, counts = np.unique(
+        labels, return_inverse=True, return_counts=True
+    )
+    cluster_sample_sizes = np.maximum(
+        np.round(counts * sample_size / len(labels)).astype(int), 1
+    )
+
+    order = np.argsort(inverse, kind="stable")
+    cluster_indices = np.split(order, np.cumsum(counts)[:-1])
+
+    indices = np.concatenate(
+        [
+            rng.choice(indices, size=size, replace=False)
+            for indices, size in zip(cluster_indices, cluster_sample_sizes)
+        ]
+    )
+    return np.sort(indices)
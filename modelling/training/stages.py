@@ -0,0 +1,14 @@
+from contextlib import contextmanager
+
+from common.utils.profiling import measure
+
+
+@contextmanager
+def measure_stage(training_session, stage):
+    # Appends the wall time, CPU time and peak RSS of the stage to the session and
+    # saves them right away, so that a running session shows where it spends time
+    with measure(sample_rss=True) as stats:
+        yield
+
+    training_session.stage_metrics.append({"stage": stage, **stats})
+    training_session.save(update_fields=["stage_metrics", "modified_at"])
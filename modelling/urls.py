@@ -15,4 +15,9 @@ urlpatterns = [
         views.TrainingSessionRetrieveView.as_view(),
         name="training-session-retrieve",
     ),
+    path(
+        "model-cache/",
+        views.ModelCacheStatsView.as_view(),
+        name="model-cache-stats",
+    ),
 ]
@@ -0,0 +1,97 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import joblib
+from django.conf import settings
+
+CacheEntry = namedtuple("CacheEntry", ("identity", "model", "size"))
+
+
+# Per-process LRU cache of models loaded from disk. Entries are validated against
+# the identity of their file (path, inode, size and modification time), so
+# rewritten artifacts are reloaded on the next access.
+class ModelCache:
+    def __init__(self, max_items=None, max_bytes=None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def load(self, key, path):
+        identity = self._get_file_identity(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.identity == identity:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.model
+
+            if entry is not None:
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+
+        model = joblib.load(path)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            # the pickle size is used as an estimate of the model memory footprint
+            self._entries[key] = CacheEntry(identity, model, identity[2])
+            self._size += identity[2]
+            self._evict()
+
+        return model
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "items": len(self._entries),
+                "bytes": self._size,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _evict(self):
+        # the most recently loaded model is always kept, even if it alone
+        # exceeds the memory bound
+        while len(self._entries) > 1 and (
+            (self.max_items and len(self._entries) > self.max_items)
+            or (self.max_bytes and self._size > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+    @staticmethod
+    def _get_file_identity(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+model_cache = ModelCache(
+    max_items=settings.MODEL_CACHE_MAX_ITEMS,
+    max_bytes=settings.MODEL_CACHE_MAX_BYTES,
+)
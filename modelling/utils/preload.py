@@ -0,0 +1,64 @@
+import importlib
+import logging
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("ecg_analysis")
+
+HEAVY_MODULES = (
+    "pandas",
+    "scipy.stats",
+    "biosppy.signals.ecg",
+    "sklearn.cluster",
+    "sklearn.ensemble",
+    "sklearn.neighbors",
+    "sklearn.svm",
+    "gensim.models",
+    "plotly.express",
+    "plotly.graph_objects",
+    "plotly.figure_factory",
+    "analysis.utils.analyzer",
+)
+
+
+def warm_up():
+    from modelling.data_preparation.manager import MITDBDatasetManager
+    from modelling.models import TrainingSession
+
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+    logger.info("Heavy modules have been imported.")
+
+    try:
+        MITDBDatasetManager.load_scalers_from_cache()
+        logger.info("Scalers have been preloaded.")
+    except FileNotFoundError:
+        logger.warning("Scalers are not cached yet, skipping their preloading.")
+
+    for training_session_id in settings.PRELOAD_TRAINING_SESSIONS:
+        # a session that cannot be loaded must not keep the server from starting
+        try:
+            training_session = TrainingSession.objects.filter(
+                pk=training_session_id
+            ).first()
+            if not training_session or not training_session.classifier_model:
+                logger.warning(
+                    f"Training session {training_session_id} has no models, skipping its preloading."
+                )
+                continue
+
+            training_session.get_kmeans_models()
+            training_session.get_word2vec_model()
+            training_session.get_classifier_model()
+            training_session.get_label_table()
+        except Exception:
+            logger.exception(
+                f"Training session {training_session_id} could not be preloaded, skipping it."
+            )
+            continue
+
+        logger.info(f"Training session {training_session_id} has been preloaded.")
+
+    # forked workers must not share the connections opened by the master
+    connections.close_all()
@@ -1,7 +1,10 @@
 from copy import deepcopy
 
+from django.conf import settings
 from django.db import transaction
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import RetrieveAPIView
+from sklearn.model_selection import ParameterGrid
 
 from rest_framework.response import Response
 from rest_framework.status import HTTP_201_CREATED
@@ -17,6 +20,7 @@ from .serializers import (
     TrainingSessionSerializer,
 )
 from .tasks import q_train_model
+from .utils.model_cache import model_cache
 
 
 class TrainingSessionCreateView(APIView):
@@ -37,7 +41,7 @@ class TrainingSessionCreateView(APIView):
         general_params_validated = general_params_serializer.validated_data
 
         algorithm, algorithm_params = general_params_validated["algorithm"], data.pop(
-            "algorithm_params"
+            "algorithm_params", {}
         )
         algorithm_params_serializer = self.ALGORITHM_SERIALIZER[algorithm](
             data=algorithm_params
@@ -45,6 +49,10 @@ class TrainingSessionCreateView(APIView):
         algorithm_params_serializer.is_valid(raise_exception=True)
         algorithm_params_validated = algorithm_params_serializer.validated_data
 
+        sweep_candidates = self.get_sweep_candidates(
+            algorithm, data.pop("param_grid", None)
+        )
+
         training_session = TrainingSession.objects.create()
         training_session_id_str = str(training_session.id)
 
@@ -52,11 +60,47 @@ class TrainingSessionCreateView(APIView):
             training_session_id_str,
             general_params_validated,
             algorithm_params_validated,
+            sweep_candidates,
         ))
 
         return Response({"id": training_session_id_str}, status=HTTP_201_CREATED)
 
+    @classmethod
+    def get_sweep_candidates(cls, algorithm, param_grid):
+        # a grid of classifier parameters, e.g. {"n_neighbors": [3, 5, 7]}
+        if not param_grid:
+            return None
+
+        try:
+            grid = ParameterGrid(param_grid)
+        except (TypeError, ValueError) as e:
+            raise ValidationError({"param_grid": [str(e)]})
+
+        if len(grid) > settings.TRAINING_SWEEP_MAX_CANDIDATES:
+            raise ValidationError(
+                {
+                    "param_grid": [
+                        f"The grid has {len(grid)} candidates, at most "
+                        f"{settings.TRAINING_SWEEP_MAX_CANDIDATES} are allowed."
+                    ]
+                }
+            )
+
+        candidates = []
+        for params in grid:
+            serializer = cls.ALGORITHM_SERIALIZER[algorithm](data=params)
+            if not serializer.is_valid():
+                raise ValidationError({"param_grid": serializer.errors})
+            candidates.append(serializer.validated_data)
+
+        return candidates
+
 
 class TrainingSessionRetrieveView(RetrieveAPIView):
     queryset = TrainingSession.objects.all()
     serializer_class = TrainingSessionSerializer
+
+
+class ModelCacheStatsView(APIView):
+    def get(self, request):
+        return Response(model_cache.get_stats())
@@ -1,5 +1,8 @@
 const root = document.getElementById("app");
 
+// Recordings of at least this size (bytes) are analyzed by the celery worker
+const ASYNC_ANALYSIS_MIN_FILE_SIZE = 512 * 1024;
+
 function getCookie(name) {
     const value = `; ${document.cookie}`;
     const parts = value.split(`; ${name}=`);
@@ -105,16 +108,16 @@ const TrainingService = {
                 TrainingService.trainingStatus = response.status;
 
                 if (response.status === "done") {
+                    // t-SNE charts follow the metrics, polling goes on until they are ready
                     TrainingService.chartsData = JSON.parse(response.charts);
+                    if (response.charts_ready || response.charts_failed) {
+                        clearInterval(TrainingService.interval);
+                    }
                     delete response.charts;
 
                     TrainingService.trainingMetrics = response;
                 }
             });
-
-            if (TrainingService.trainingStatus === "done") {
-                clearInterval(TrainingService.interval);
-            }
         }, 2000);
     },
 };
@@ -382,7 +385,7 @@ const TrainingResult = {
                         ])
                     ])
                 ]),
-                m(".col-6", [
+                TrainingService.chartsData['tsne'] && m(".col-6", [
                     m(".card.h-100", [
                         m(".card-body", [
                             m("h5.card-title", "TSNE of QRS complexes"),
@@ -391,7 +394,9 @@ const TrainingResult = {
                     ])
                 ]),
             ]),
-            m(".row.mt-4", [
+            TrainingService.chartsData['tsne_error'] && m(".mt-4.text-danger", "The t-SNE charts could not be generated."),
+            !TrainingService.chartsData['tsne'] && !TrainingService.chartsData['tsne_error'] && m(".mt-4", "Generating charts..."),
+            TrainingService.chartsData['tsne'] && m(".row.mt-4", [
                 m(".col-6", [
                     m(".card.h-100", [
                         m(".card-body", [
@@ -488,13 +493,16 @@ const FileUpload = {
 
 
 const AnalysisService = {
+    sessionId: null,
     chartsData: {},
     tableData: {},
     showResults: false,
     analysisStatus: null,
+    analysisError: null,
 
     runAnalysis: function (data) {
         AnalysisService.analysisStatus = 'running';
+        AnalysisService.analysisError = null;
         m.request({
             method: "POST",
             url: "/api/analysis/session/",
@@ -503,16 +511,45 @@ const AnalysisService = {
                 "X-CSRFToken": getCookie("csrftoken")
             }
         }).then(response => {
-            AnalysisService.showResults = true;
-            AnalysisService.chartsData = response['charts'];
-            AnalysisService.tableData = response['table'];
-            AnalysisService.analysisStatus = 'done';
+            if (response['status'] !== undefined) {
+                AnalysisService.sessionId = response.id;
+                AnalysisService.checkStatus();
+                return;
+            }
 
+            AnalysisService.showResult(response);
         }).catch(error => {
             AnalysisService.errors = error.response;
         });
 
     },
+    showResult: function (result) {
+        AnalysisService.showResults = true;
+        AnalysisService.chartsData = result['charts'];
+        AnalysisService.tableData = result['table'];
+        AnalysisService.analysisStatus = 'done';
+    },
+    checkStatus: function () {
+        if (AnalysisService.sessionId === null) return;
+
+        clearInterval(AnalysisService.interval);
+
+        AnalysisService.interval = setInterval(() => {
+            m.request({
+                method: "GET",
+                url: "/api/analysis/session/" + AnalysisService.sessionId,
+            }).then(response => {
+                if (response.status === "done") {
+                    clearInterval(AnalysisService.interval);
+                    AnalysisService.showResult(response.result);
+                } else if (response.status === "failed") {
+                    clearInterval(AnalysisService.interval);
+                    AnalysisService.analysisStatus = 'failed';
+                    AnalysisService.analysisError = response.error;
+                }
+            });
+        }, 2000);
+    },
 };
 
 const AnalysisSetup = {
@@ -549,6 +586,7 @@ const AnalysisSetup = {
                         formData.append('ecg_file', FileUpload.file);
                         formData.append('fs', AnalysisSetup.fs);
                         formData.append('training_session_id', TrainingService.sessionId);
+                        formData.append('async', FileUpload.file.size >= ASYNC_ANALYSIS_MIN_FILE_SIZE);
 
                         AnalysisService.runAnalysis(formData)
                     }
@@ -560,6 +598,13 @@ const AnalysisSetup = {
 
 const AnalysisResult = {
     view: function () {
+        if (AnalysisService.analysisStatus === "failed") {
+            return m('.d-flex.flex-column.justify-content-flex-start', [
+                m('h3', 'Result'),
+                m(".text-danger.mt-4", "The analysis failed: " + AnalysisService.analysisError)
+            ])
+        }
+
         if (AnalysisService.analysisStatus !== "done") {
             return m(StatusSpinner, {status: 'analyzing'})
         }